@@ -1,9 +1,24 @@
+import bisect
+from itertools import islice
+
+from index_store import decode_words
+from prefix_search import prefix_successor
+
+# Average deep size of a node (slotted object and key string)
+# measured with utils.deep_sizeof on the sample corpus under CPython 3.11,
+# 64-bit.
+NODE_BYTES = 128
+
+
 class AVLNode:
+    __slots__ = ('key', 'left', 'right', 'height', 'size')
+
     def __init__(self, key: str):
         self.key = key
         self.left = None
         self.right = None
         self.height = 1  # Height of the node
+        self.size = 1  # Number of nodes in this subtree
         
 class AVLTree:
 
@@ -14,20 +29,24 @@ class AVLTree:
     def _height(self, node: AVLNode) -> int:
         return node.height if node else 0
 
+    def _size(self, node: AVLNode) -> int:
+        return node.size if node else 0
+
     def _balance_factor(self, node: AVLNode) -> int:
         return self._height(node.left) - self._height(node.right) if node else 0
 
-    def _update_height(self, node: AVLNode):
+    def _update(self, node: AVLNode):
         node.height = 1 + max(self._height(node.left),
                               self._height(node.right))
+        node.size = 1 + self._size(node.left) + self._size(node.right)
 
     def _rotate_right(self, y: AVLNode) -> AVLNode:
         x = y.left
         T2 = x.right
         x.right = y
         y.left = T2
-        self._update_height(y)
-        self._update_height(x)
+        self._update(y)
+        self._update(x)
         return x
 
     def _rotate_left(self, x: AVLNode) -> AVLNode:
@@ -35,8 +54,8 @@ class AVLTree:
         T2 = y.left
         y.left = x
         x.right = T2
-        self._update_height(x)
-        self._update_height(y)
+        self._update(x)
+        self._update(y)
         return y
 
     def _balance(self, node: AVLNode) -> AVLNode:
@@ -56,38 +75,180 @@ class AVLTree:
 
         return node
 
-    def insert(self, word: str):
-        def _insert(node: AVLNode, word: str) -> AVLNode:
-            if not node:
-                self.word_count += 1
-                return AVLNode(word)
+    def _copy(self, node: AVLNode) -> AVLNode:
+        copy = AVLNode(node.key)
+        copy.left, copy.right = node.left, node.right
+        copy.height, copy.size = node.height, node.size
+        return copy
 
+    def _add(self, word: str, copy: bool) -> AVLNode:
+        """Return the root after adding ``word``, or None if it is already
+        present. With ``copy``, nodes on the path are copied rather than
+        modified, so the old root still describes the old tree; rotations
+        after an insert only touch nodes on that path."""
+        # Walk down recording the path, then rebalance bottom-up.
+        path = []
+        node = self.root
+        while node:
             if word < node.key:
-                node.left = _insert(node.left, word)
+                path.append((node, True))
+                node = node.left
             elif word > node.key:
-                node.right = _insert(node.right, word)
+                path.append((node, False))
+                node = node.right
             else:
-                return node  # Duplicate, do nothing
+                return None  # Duplicate, do nothing
 
-            self._update_height(node)
-            return self._balance(node)
+        subtree = AVLNode(word)
+        for parent, went_left in reversed(path):
+            if copy:
+                parent = self._copy(parent)
+            if went_left:
+                parent.left = subtree
+            else:
+                parent.right = subtree
+            self._update(parent)
+            subtree = self._balance(parent)
+        return subtree
 
-        self.root = _insert(self.root, word)
+    def insert(self, word: str):
+        root = self._add(word, copy=False)
+        if root is not None:
+            self.root = root
+            self.word_count += 1
 
-    def search(self, prefix: str) -> list[str]:
-        suggestions = []
-        self._collect_prefix_matches(self.root, prefix, suggestions)
-        return sorted(list(set(suggestions)))
+    def inserted(self, word: str) -> 'AVLTree':
+        """Return a new tree with ``word`` added, sharing every node off the
+        insertion path with this one, which is left unchanged."""
+        root = self._add(word, copy=True)
+        if root is None:
+            return self
+        tree = AVLTree()
+        tree.root = root
+        tree.word_count = self.word_count + 1
+        return tree
 
-    def _collect_prefix_matches(self, node: AVLNode, prefix: str, suggestions: list):
-        if not node:
-            return
-        self._collect_prefix_matches(node.left, prefix, suggestions)
+    def search(self, prefix: str, limit: int = None, offset: int = 0) -> list[str]:
+        return list(self.iter_prefix(prefix, limit, offset))
 
-        if node.key.startswith(prefix):
-            suggestions.append(node.key)
+    def search_many(self, prefixes) -> dict:
+        """Answer many prefixes in one merged in-order sweep.
 
-        self._collect_prefix_matches(node.right, prefix, suggestions)
+        Prefixes are visited in sorted order, so their lower bounds only move
+        forward: keys pulled from the sweep are buffered for the following
+        prefixes, and the tree is only descended again when the next prefix
+        lies beyond everything buffered. A range ends at the prefix's
+        successor; the subtree sizes give how many keys to pull up to it, and
+        a bisect finds it in the buffer.
+        """
+        results = {}
+        buffer = []
+        head = 0
+        pulled = 0  # Rank of the next key the sweep yields
+        sweep = iter(())
+        for prefix in sorted(set(prefixes)):
+            head = bisect.bisect_left(buffer, prefix, head)
+            if head == len(buffer):
+                buffer, head = [], 0
+                sweep = self._iter_from(prefix)
+                pulled = self.rank(prefix)
+            successor = prefix_successor(prefix)
+            if successor is None:
+                buffer.extend(sweep)
+                pulled = self.word_count
+                end = len(buffer)
+            else:
+                if not buffer or buffer[-1] < successor:
+                    wanted = self.rank(successor)
+                    buffer.extend(islice(sweep, wanted - pulled))
+                    pulled = wanted
+                end = bisect.bisect_left(buffer, successor, head)
+            results[prefix] = buffer[head:end]
+        return results
+
+    def rank(self, word: str) -> int:
+        """Number of keys strictly smaller than ``word``."""
+        rank = 0
+        node = self.root
+        while node:
+            if node.key < word:
+                rank += self._size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def select(self, index: int) -> str:
+        """Return the key at 0-based position ``index`` in sorted order."""
+        if not 0 <= index < self._size(self.root):
+            raise IndexError("AVLTree index out of range")
+        node = self.root
+        while True:
+            left_size = self._size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.key
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    def count_prefix(self, prefix: str) -> int:
+        # Keys below or inside the prefix range, minus the keys below it.
+        end = 0
+        node = self.root
+        while node:
+            if node.key < prefix or node.key.startswith(prefix):
+                end += self._size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return end - self.rank(prefix)
+
+    def iter_prefix(self, prefix: str, limit: int = None, offset: int = 0):
+        """Yield the keys starting with ``prefix`` in sorted order.
+
+        Descends once to the first key >= prefix and then walks in-order
+        successors until a key no longer matches, so the cost is
+        O(log n + k) and callers may stop early. ``offset`` skips that many
+        matches in O(log n) through the subtree sizes.
+        """
+        if limit is not None and limit <= 0:
+            return
+        start = prefix
+        if offset:
+            position = self.rank(prefix) + offset
+            if position >= self.word_count:
+                return
+            start = self.select(position)
+        emitted = 0
+        for key in self._iter_from(start):
+            if not key.startswith(prefix):
+                return
+            yield key
+            emitted += 1
+            if emitted == limit:
+                return
+
+    def _iter_from(self, key: str):
+        """Yield keys >= ``key`` in sorted order."""
+        # The stack holds the ancestors whose key is still to be visited,
+        # i.e. the nodes where the lower-bound descent went left.
+        stack = []
+        node = self.root
+        while node:
+            if node.key >= key:
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node.key
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
 
     def _min_value_node(self, node: AVLNode) -> AVLNode:
         current = node
@@ -96,17 +257,43 @@ class AVLTree:
         return current
 
     def bulk_insert(self, words):
-        for word in words:
-            self.insert(word)
+        # Sort and deduplicate once, then build a perfectly balanced tree in
+        # O(n) instead of paying rotations on every insert.
+        self._build(sorted(set(self._iter_from('')).union(words)))
 
-    def mem_usage(self) -> float:
-        def count_nodes(node: AVLNode) -> int:
-            if not node:
-                return 0
-            return 1 + count_nodes(node.left) + count_nodes(node.right)
+    def import_sections(self, sections):
+        # The stored vocabulary is already sorted and unique.
+        self._build(decode_words(sections))
+
+    def _build(self, keys):
+        # Splitting at the middle gives a subtree of n keys the height
+        # n.bit_length(), so sizes and heights are set as nodes are made.
+        root = None
+        stack = [(0, len(keys), None, False)]
+        while stack:
+            lo, hi, parent, is_left = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            node = AVLNode(keys[mid])
+            node.size = hi - lo
+            node.height = node.size.bit_length()
+            if parent is None:
+                root = node
+            elif is_left:
+                parent.left = node
+            else:
+                parent.right = node
+            stack.append((lo, mid, node, True))
+            stack.append((mid + 1, hi, node, False))
+        self.root = root
+        self.word_count = len(keys)
+
+    def node_count(self) -> int:
+        return self._size(self.root)
 
-        node_count = count_nodes(self.root)
-        return (node_count * 150) / 1024  # Convert to KB
+    def mem_usage(self) -> float:
+        return (self.node_count() * NODE_BYTES) / 1024  # Convert to KB
 
     def complexity(self) -> dict:
         return {
@@ -1,49 +1,185 @@
 from utils import (
-    load_corpus, calculate_accuracy, save_results_to_csv, rank_structures,
+    load_corpus, calculate_accuracy, save_results, run_parameters, rank_structures,
     get_prefixes_for_testing, validate_implementations, initialize_structure,
-    benchmark_build_time, benchmark_search_time, simulate_scalability
+    benchmark_build_time, benchmark_search_time, simulate_scalability,
+    structure_pickle_size, benchmark_insert_throughput, corpus_frequencies,
+    benchmark_batch_search, benchmark_fuzzy_search, measure_memory,
+    synthetic_corpus, benchmark_concurrent_ingest, latency_summary, measure,
+    deep_sizeof
 )
 from suffix_tree import SuffixTree
 from segment_tree import SegmentTree
 from avl_tree import AVLTree
 from trie import Trie
+from radix_trie import RadixTrie
+from dawg import DAWG
+from ngram_index import NGramIndex
+from sorted_array import SortedArrayIndex
+from result_cache import CachedStructure
+from server import AutocompleteServer, run_load, serve
+import asyncio
 import time
+import random
 import argparse
 import matplotlib.pyplot as plt
 from collections import defaultdict
 import statistics
+import sys
+
+
+def _recursive_collect(node, current_prefix, suggestions):
+    # The recursive Trie traversal the structures used before, kept only as
+    # the baseline for benchmark_deep_prefixes.
+    if node.is_end_of_word:
+        suggestions.append(current_prefix)
+    for char, child in (node.children or {}).items():
+        _recursive_collect(child, current_prefix + char, suggestions)
+
+
+def benchmark_deep_prefixes(depths=(50, 200, 800, 3000), branches=20, runs=200):
+    """Per-query cost of collecting completions under deep prefixes, with the
+    explicit-stack traversal versus the old recursive one."""
+    results = {}
+    for depth in depths:
+        stem = 'a' * depth
+        trie = Trie()
+        trie.bulk_insert(stem + 'b' * i for i in range(1, branches + 1))
+        node = trie._find_node(stem)
+
+        start_time = time.perf_counter()
+        for _ in range(runs):
+            trie._collect_words(node, stem, [])
+        iterative_us = (time.perf_counter() - start_time) / runs * 1e6
+
+        try:
+            start_time = time.perf_counter()
+            for _ in range(runs):
+                _recursive_collect(trie.root, '', [])
+            recursive_us = (time.perf_counter() - start_time) / runs * 1e6
+        except RecursionError:
+            recursive_us = None
+
+        start_time = time.perf_counter()
+        for _ in range(runs):
+            trie._collect_words(trie.root, '', [])
+        iterative_root_us = (time.perf_counter() - start_time) / runs * 1e6
+
+        results[depth] = {'iterative_us': iterative_root_us,
+                          'recursive_us': recursive_us,
+                          'from_prefix_us': iterative_us}
+    return results
+
+
+class _DictTrieNode:
+    # The unslotted TrieNode the structures used before (an attribute dict
+    # per node and a children dict even on leaves), kept only as the
+    # baseline for benchmark_node_layouts.
+    def __init__(self):
+        self.children = {}
+        self.is_end_of_word = False
+        self.frequency = 0
+        self.top = []
+
+
+class _DictAVLNode:
+    # The unslotted AVLNode, kept for the same reason.
+    def __init__(self, key):
+        self.key = key
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.size = 1
+
+
+def _unslotted_trie(root):
+    # Same shape, counts and top-k lists as ``root``, in _DictTrieNodes.
+    copy_root = _DictTrieNode()
+    stack = [(root, copy_root)]
+    while stack:
+        node, copy = stack.pop()
+        copy.is_end_of_word = node.is_end_of_word
+        copy.frequency = node.frequency
+        copy.top = node.top
+        for char, child in (node.children or {}).items():
+            copy.children[char] = child_copy = _DictTrieNode()
+            stack.append((child, child_copy))
+    return copy_root
+
+
+def _unslotted_avl(root):
+    # Same shape and keys as ``root``, in _DictAVLNodes.
+    if root is None:
+        return None
+    copy_root = _DictAVLNode(root.key)
+    stack = [(root, copy_root)]
+    while stack:
+        node, copy = stack.pop()
+        copy.height, copy.size = node.height, node.size
+        for side in ('left', 'right'):
+            child = getattr(node, side)
+            if child is not None:
+                child_copy = _DictAVLNode(child.key)
+                setattr(copy, side, child_copy)
+                stack.append((child, child_copy))
+    return copy_root
+
+
+def benchmark_node_layouts(corpus) -> dict:
+    """Deep size of the Trie and AVLTree built from ``corpus`` with their
+    slotted node classes versus the same trees in unslotted nodes."""
+    results = {}
+    for name, cls, unslotted in (('Trie', Trie, _unslotted_trie),
+                                 ('AVLTree', AVLTree, _unslotted_avl)):
+        ds = cls()
+        ds.bulk_insert(corpus)
+        # The word strings are shared by both layouts, so they are left out.
+        words = sum(sys.getsizeof(word) for word in set(corpus))
+        results[name] = {
+            'slotted_kb': (deep_sizeof(ds.root) - words) / 1024,
+            'unslotted_kb': (deep_sizeof(unslotted(ds.root)) - words) / 1024,
+            'nodes': ds.node_count(),
+        }
+    return results
 
 
 class DataStructureComparator:
-    def __init__(self):
+    def __init__(self, corpus_file='sample_corpus.txt', tokenize=False, cache_size=None,
+                 mapped=False):
         self.structures = {
             'Trie': Trie(),
+            'RadixTrie': RadixTrie(),
             'AVLTree': AVLTree(),
             'SegmentTree': SegmentTree(),
-            'SuffixTree': SuffixTree()
+            'SuffixTree': SuffixTree(),
+            'SortedArray': SortedArrayIndex(),
+            'DAWG': DAWG()
         }
 
         if not validate_implementations(self.structures):
             print("Implementation validation failed!")
             return
-        self.corpus = load_corpus()
-        self.structures = initialize_structure(self.structures)
+        # Distinct words in first-seen order; streamed, so free-text corpora
+        # never have to fit in memory as a token list.
+        self.corpus = list(corpus_frequencies(corpus_file, tokenize))
+        self.corpus_file = corpus_file
+        self.tokenize = tokenize
+        self.params = {}
+        wrapper = None
+        if cache_size:
+            wrapper = lambda ds: CachedStructure(ds, maxsize=cache_size)
+        self.structures = initialize_structure(self.structures, corpus_file, tokenize,
+                                               wrapper, mapped)
 
     def benchmark_operation(self, operation, *args, **kwargs):
         results = {}
         for name, ds in self.structures.items():
-            start_time = time.time()
+            start_time = time.perf_counter_ns()
             result = getattr(ds, operation)(*args, **kwargs)
-            end_time = time.time()
-            elapsed_ms = (end_time - start_time) * 1000
-            memory_kb = ds.mem_usage()
-
-            results[name] = {
-                'time': elapsed_ms,
-                'result': result,
-                'memory': memory_kb
-            }
-
+            elapsed_ms = (time.perf_counter_ns() - start_time) / 1e6
+            results[name] = {'time': elapsed_ms, 'result': result}
+        # Memory is walked only after every structure has been timed.
+        for name, ds in self.structures.items():
+            results[name]['memory'] = ds.mem_usage()
         return results
 
     def run_single_test(self, prefix):
@@ -78,47 +214,49 @@ class DataStructureComparator:
 
         return results
 
-    def run_benchmark(self, prefixes=None, runs=3):
+    def run_benchmark(self, prefixes=None, warmup=3, iterations=30):
         if prefixes is None:
             prefixes = get_prefixes_for_testing(self.corpus)
+        self.params = run_parameters(self.corpus_file, self.tokenize, len(self.corpus),
+                                     warmup, iterations)
+        self.params['prefixes'] = ' '.join(prefixes)
 
+        # Results do not change between runs: one pass for accuracy.
         results = defaultdict(lambda: defaultdict(list))
-
         for prefix in prefixes:
-            for run in range(runs):
-                bench_results = self.benchmark_operation('search', prefix)
-
-                for ds_name, data in bench_results.items():
-                    unique_results = list(dict.fromkeys(data['result']))
-
-                    accuracy, _, _ = calculate_accuracy(
-                        unique_results, prefix, self.corpus)
-
-                    results[ds_name]['time'].append(data['time'])
-                    results[ds_name]['accuracy'].append(accuracy)
-                    results[ds_name]['memory'].append(data['memory'])
-                    results[ds_name]['suggestions'].append(len(unique_results))
-
-        # Benchmark build time
+            bench_results = self.benchmark_operation('search', prefix)
+            for ds_name, data in bench_results.items():
+                unique_results = list(dict.fromkeys(data['result']))
+                accuracy, _, _ = calculate_accuracy(
+                    unique_results, prefix, self.corpus)
+                results[ds_name]['accuracy'].append(accuracy)
+                results[ds_name]['suggestions'].append(len(unique_results))
+        memory = {ds_name: ds.mem_usage() for ds_name, ds in self.structures.items()}
+
+        # Benchmark build time (fresh instances)
         build_times = benchmark_build_time(self.structures, self.corpus)
 
         # Benchmark search time
-        search_times = benchmark_search_time(self.structures, prefixes, runs)
+        search_times = benchmark_search_time(self.structures, prefixes, warmup, iterations)
 
         # Simulate scalability
         corpus_sizes = [100, 500, 1000, 2000, len(self.corpus)]
-        scalability = simulate_scalability(self.structures, corpus_sizes)
+        scalability = simulate_scalability(self.structures, corpus_sizes, self.corpus)
 
         summary = {}
         for ds_name, metrics in results.items():
             summary[ds_name] = {
-                'avg_time': sum(metrics['time']) / len(metrics['time']),
+                'avg_time': search_times[ds_name]['mean'],
                 'avg_accuracy': sum(metrics['accuracy']) / len(metrics['accuracy']),
-                'avg_memory': sum(metrics['memory']) / len(metrics['memory']),
+                'avg_memory': memory[ds_name],
                 'avg_suggestions': sum(metrics['suggestions']) / len(metrics['suggestions']),
-                'build_time': build_times[ds_name],
-                'search_time': search_times[ds_name],
+                'build_time': build_times[ds_name]['p50'],
+                'build_p95': build_times[ds_name]['p95'],
+                'search_time': search_times[ds_name]['p50'],
+                'search_p95': search_times[ds_name]['p95'],
+                'search_p99': search_times[ds_name]['p99'],
                 'scalability': scalability[ds_name],
+                'pickle_size': structure_pickle_size(self.structures[ds_name]),
                 'time_complexity': self.structures[ds_name].complexity()['time'],
                 'space_complexity': self.structures[ds_name].complexity()['space']
             }
@@ -129,14 +267,15 @@ class DataStructureComparator:
         ds_names = list(summary.keys())
         metrics = ['avg_accuracy', 'build_time',
                    'search_time', 'avg_memory', 'avg_suggestions']
-        metric_labels = ['Accuracy (%)', 'Build Time (ms)', 'Search Time (ms)',
+        metric_labels = ['Accuracy (%)', 'Build Time (ms)', 'Search p50 (ms)',
                          'Memory (KB)', 'Suggestions Count']
 
         fig, axes = plt.subplots(3, 2, figsize=(16, 12))
         fig.suptitle(title, fontsize=16, fontweight='bold')
 
         colors = ['#1f77b4', '#ff7f0e', '#2ca02c',
-                  '#d62728']  # Blue, Orange, Green, Red
+                  '#d62728', '#9467bd', '#8c564b', '#e377c2']
+        # Blue, Orange, Green, Red, Purple, Brown, Pink
 
         for i, (metric, label) in enumerate(zip(metrics, metric_labels)):
             ax = axes[i//2, i % 2]
@@ -193,17 +332,17 @@ class DataStructureComparator:
                     break
                 elif prefix.lower() == 'benchmark':
                     summary = self.run_benchmark()
-                    print(f"\n============================================================\nPerformance Summary for 'Benchmark Results'\n============================================================\nStructure       Time (ms)  Accuracy (%) Memory (KB)  Suggestions  Build (ms)  Search (ms)\n------------------------------------------------------------")
+                    print(f"\n============================================================\nPerformance Summary for 'Benchmark Results'\n============================================================\nStructure       p50 (ms)   p95 (ms)   p99 (ms)   Accuracy (%) Memory (KB)  Suggestions  Build (ms)\n------------------------------------------------------------")
                     for ds_name, data in summary.items():
                         print(
-                            f"{ds_name:<15} {data['avg_time']:<10.2f} {data['avg_accuracy']:<12.2f} {data['avg_memory']:<12.2f} {data['avg_suggestions']:<12.2f} {data['build_time']:<10.2f} {data['search_time']:<10.2f}")
+                            f"{ds_name:<15} {data['search_time']:<10.4f} {data['search_p95']:<10.4f} {data['search_p99']:<10.4f} {data['avg_accuracy']:<12.2f} {data['avg_memory']:<12.2f} {data['avg_suggestions']:<12.2f} {data['build_time']:<10.2f}")
                     print(
                         "============================================================")
                     ranked = rank_structures(summary)
                     print("Efficiency Ranking:")
                     for i, ds in enumerate(ranked, 1):
                         print(f"  {i}. {ds}")
-                    save_results_to_csv(summary)
+                    save_results(summary, self.params)
                     self.plot_results(summary, "Automated Benchmark Results")
                     break
                 elif prefix:
@@ -227,28 +366,224 @@ class DataStructureComparator:
                 continue
 
 
+async def run_load_test(args):
+    # Prefix stems taken once per corpus word, so common stems are requested
+    # (and coalesced) more often.
+    words = list(corpus_frequencies(args.corpus, args.tokenize))
+    prefixes = [word[:length] for word in words for length in range(2, 5)
+                if len(word) >= length]
+    server = None
+    if args.serve:
+        comparator = DataStructureComparator(args.corpus, args.tokenize, args.cache_size,
+                                             args.mapped)
+        server = await AutocompleteServer(
+            comparator.structures[args.structure], args.batch_window).start(
+            args.host, args.port, args.unix_socket)
+    try:
+        results = await run_load(prefixes, args.requests, args.concurrency,
+                                 host=args.host, port=args.port, unix_path=args.unix_socket)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    latency = results['latency']
+    print(f"{results['requests']} requests over {args.concurrency} connections, "
+          f"{results['errors']} errors")
+    print(f"Throughput: {results['throughput']:.0f} req/s")
+    print(f"Latency (ms): p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  "
+          f"p99 {latency['p99']:.3f}  max {latency['max']:.3f}")
+    server_stats = results['server']
+    print(f"Server: {server_stats['coalesced']} coalesced, {server_stats['batches']} batches, "
+          f"{server_stats['avg_batch']:.1f} prefixes per batch")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Compare data structures for NLP autocomplete")
     parser.add_argument('--benchmark', action='store_true')
     parser.add_argument('--prefix', type=str)
+    parser.add_argument('--insert-benchmark', action='store_true')
+    parser.add_argument('--deep-prefix-benchmark', action='store_true')
+    parser.add_argument('--batch-benchmark', action='store_true')
+    parser.add_argument('--shard-benchmark', action='store_true')
+    parser.add_argument('--memory-benchmark', action='store_true',
+                        help="measure memory with tracemalloc and a deep sizeof walk")
+    parser.add_argument('--synthetic-factor', type=int, default=10,
+                        help="also measure memory on a synthetic corpus this many times larger")
+    parser.add_argument('--snapshot-benchmark', action='store_true',
+                        help="insert new words while reader threads query copy-on-write snapshots")
+    parser.add_argument('--phrase', type=str,
+                        help="complete a multi-word phrase from an n-gram index")
+    parser.add_argument('--ngram-corpus', type=str, default=None,
+                        help="free-text file for the n-gram index (required with --phrase)")
+    parser.add_argument('--ngram-order', type=int, default=3)
+    parser.add_argument('--fuzzy-benchmark', action='store_true')
+    parser.add_argument('--max-edits', type=int, default=1)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help="wrap every structure in an LRU result cache of this size")
+    parser.add_argument('--warmup', type=int, default=3,
+                        help="untimed calls before each measured query")
+    parser.add_argument('--iterations', type=int, default=30,
+                        help="timed calls per query and prefix")
+    parser.add_argument('--output', type=str, default='benchmark_results.csv',
+                        help="benchmark results file (.json or .csv)")
+    parser.add_argument('--serve', action='store_true',
+                        help="serve prefix queries (JSON lines) from one loaded structure")
+    parser.add_argument('--load-test', action='store_true',
+                        help="drive a server with concurrent clients; with --serve, an in-process one")
+    parser.add_argument('--structure', type=str, default='Trie')
+    parser.add_argument('--mapped', action='store_true',
+                        help="answer --serve/--load-test/--prefix queries straight from the "
+                             "memory-mapped index files instead of building the structures")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', type=str, default=None)
+    parser.add_argument('--batch-window', type=float, default=0.001,
+                        help="seconds to gather concurrent queries into one search_many")
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--corpus', type=str, default='sample_corpus.txt')
+    parser.add_argument('--tokenize', action='store_true',
+                        help="treat the corpus as free text instead of one word per line")
 
     args = parser.parse_args()
-
-    comparator = DataStructureComparator()
+    if args.mapped and not (args.serve or args.load_test or args.prefix):
+        parser.error("--mapped only applies to --serve, --load-test and --prefix")
+    if args.phrase is not None and not args.ngram_corpus:
+        # The default --corpus is one word per line, which has no n-grams.
+        parser.error("--phrase needs --ngram-corpus, a free-text file")
+
+    if args.insert_benchmark:
+        words = load_corpus()
+        random.Random(0).shuffle(words)
+        throughput = benchmark_insert_throughput(SegmentTree, words)
+        print(f"SegmentTree incremental insert: {throughput['incremental_ops']:.0f} inserts/s")
+        print(f"SegmentTree rebuild-per-insert: {throughput['rebuild_ops']:.0f} inserts/s")
+        return
+
+    if args.deep_prefix_benchmark:
+        print(f"{'Depth':<8} {'Iterative (us)':<16} {'Recursive (us)':<16} {'From prefix (us)':<16}")
+        for depth, data in benchmark_deep_prefixes().items():
+            recursive = (f"{data['recursive_us']:.1f}" if data['recursive_us'] is not None
+                         else 'RecursionError')
+            print(f"{depth:<8} {data['iterative_us']:<16.1f} {recursive:<16} {data['from_prefix_us']:<16.1f}")
+        return
+
+    if args.shard_benchmark:
+        corpus = corpus_frequencies(args.corpus, args.tokenize)
+        structures = {'Trie': Trie(), 'RadixTrie': RadixTrie(), 'AVLTree': AVLTree(),
+                      'SegmentTree': SegmentTree(), 'SuffixTree': SuffixTree(),
+                      'SortedArray': SortedArrayIndex(), 'DAWG': DAWG()}
+        results = benchmark_build_time(structures, corpus, workers=args.workers)
+        header = ''.join(f"{f'{count} workers (ms)':<18}" for count in args.workers)
+        print(f"{'Structure':<15} {'Single (ms)':<12} {header}")
+        for ds_name, data in results.items():
+            row = ''.join(f"{data['scaling'][count]:<18.1f}" for count in args.workers)
+            print(f"{ds_name:<15} {data['build_time']:<12.1f} {row}")
+        return
+
+    if args.phrase is not None:
+        start_time = time.perf_counter()
+        index = NGramIndex(n=args.ngram_order).build_from_file(args.ngram_corpus)
+        build_ms = (time.perf_counter() - start_time) * 1000
+        latency = latency_summary(measure(index.complete, setup=lambda: (args.phrase,)))
+        print(f"N-gram index: order {index.n}, {index.node_count()} trie nodes, "
+              f"built in {build_ms:.1f} ms")
+        for suggestion in index.complete(args.phrase):
+            print(f"  {suggestion}")
+        print(f"Query p50 {latency['p50']:.4f} ms, p99 {latency['p99']:.4f} ms")
+        return
+
+    if args.load_test:
+        asyncio.run(run_load_test(args))
+        return
+
+    comparator = DataStructureComparator(args.corpus, args.tokenize, args.cache_size,
+                                         args.mapped)
+
+    if args.serve:
+        ds = comparator.structures[args.structure]  # Loaded once, here
+        where = args.unix_socket or f"{args.host}:{args.port}"
+        print(f"Serving {args.structure} on {where}")
+        try:
+            asyncio.run(serve(ds, args.host, args.port, args.unix_socket, args.batch_window))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.batch_benchmark:
+        # Every distinct 2-4 character stem in the corpus, so many prefixes
+        # share a descent path ("com", "comp", "compu").
+        prefixes = sorted({word[:length] for word in comparator.corpus
+                           for length in range(2, 5) if len(word) >= length})
+        results = benchmark_batch_search(comparator.structures, prefixes)
+        print(f"Batch of {len(prefixes)} prefixes")
+        print(f"{'Structure':<15} {'One by one (ms)':<17} {'search_many (ms)':<17} {'Speedup':<8}")
+        for ds_name, data in results.items():
+            speedup = data['single_ms'] / data['batch_ms'] if data['batch_ms'] else 0.0
+            print(f"{ds_name:<15} {data['single_ms']:<17.1f} {data['batch_ms']:<17.1f} {speedup:<8.2f}")
+        return
+
+    if args.memory_benchmark:
+        corpora = [('sample', comparator.corpus)]
+        if args.synthetic_factor > 1:
+            corpora.append((f'{args.synthetic_factor}x synthetic',
+                            synthetic_corpus(comparator.corpus, args.synthetic_factor)))
+        for label, corpus in corpora:
+            results = measure_memory(comparator.structures, corpus)
+            print(f"Corpus: {label} ({len(corpus)} words)")
+            print(f"{'Structure':<15} {'Estimate (KB)':<14} {'Traced (KB)':<12} {'Deep (KB)':<11} "
+                  f"{'Nodes':<8} {'Bytes/node':<10}")
+            for ds_name, data in results.items():
+                print(f"{ds_name:<15} {data['estimate_kb']:<14.1f} {data['traced_kb']:<12.1f} "
+                      f"{data['deep_kb']:<11.1f} {data['nodes']:<8} {data['bytes_per_node']:<10.1f}")
+            print(f"{'Node layout':<15} {'Unslotted (KB)':<15} {'Slotted (KB)':<13} {'Saved':<6}")
+            for ds_name, data in benchmark_node_layouts(corpus).items():
+                saved = 1 - data['slotted_kb'] / data['unslotted_kb'] if data['unslotted_kb'] else 0.0
+                print(f"{ds_name:<15} {data['unslotted_kb']:<15.1f} {data['slotted_kb']:<13.1f} "
+                      f"{saved:<6.0%}")
+        return
+
+    if args.snapshot_benchmark:
+        # The second half of a 2x synthetic corpus is ingested on top of
+        # the sample vocabulary while readers are running.
+        new_words = synthetic_corpus(comparator.corpus, 2)[len(comparator.corpus):][:2000]
+        results = benchmark_concurrent_ingest(comparator.structures, comparator.corpus, new_words)
+        print(f"Ingesting {len(new_words)} words one at a time with 4 reader threads")
+        print(f"{'Structure':<15} {'Mode':<12} {'Inserts/s':<11} {'Reads/s':<10} {'Errors':<7}")
+        for ds_name, data in results.items():
+            print(f"{ds_name:<15} {data['mode']:<12} {data['inserts_per_s']:<11.0f} "
+                  f"{data['reads_per_s']:<10.0f} {data['errors']:<7}")
+        return
+
+    if args.fuzzy_benchmark:
+        results = benchmark_fuzzy_search(comparator.structures, comparator.corpus,
+                                         max_edits=args.max_edits)
+        print(f"Typo queries at {args.max_edits} edit(s), recall@10 of the intended word")
+        print(f"{'Structure':<15} {'Fuzzy (ms)':<12} {'Exact (ms)':<12} {'Recall (%)':<11} {'Method':<10}")
+        for ds_name, data in results.items():
+            method = 'automaton' if data['native'] else 'scan'
+            print(f"{ds_name:<15} {data['fuzzy_ms']:<12.3f} {data['exact_ms']:<12.3f} "
+                  f"{data['recall'] * 100:<11.1f} {method:<10}")
+        return
 
     if args.benchmark:
-        summary = comparator.run_benchmark()
-        print(f"\n============================================================\nPerformance Summary for 'Benchmark Results'\n============================================================\nStructure       Time (ms)  Accuracy (%) Memory (KB)  Suggestions  Build (ms)  Search (ms)\n------------------------------------------------------------")
+        summary = comparator.run_benchmark(warmup=args.warmup, iterations=args.iterations)
+        print(f"\n============================================================\nPerformance Summary for 'Benchmark Results'\n============================================================\nStructure       p50 (ms)   p95 (ms)   p99 (ms)   Accuracy (%) Memory (KB)  Suggestions  Build (ms)\n------------------------------------------------------------")
         for ds_name, data in summary.items():
             print(
-                f"{ds_name:<15} {data['avg_time']:<10.3f} {data['avg_accuracy']:<12.1f} {data['avg_memory']:<12.1f} {data['avg_suggestions']:<12.0f} {data['build_time']:<10.3f} {data['search_time']:<10.3f}")
+                f"{ds_name:<15} {data['search_time']:<10.4f} {data['search_p95']:<10.4f} {data['search_p99']:<10.4f} {data['avg_accuracy']:<12.1f} {data['avg_memory']:<12.1f} {data['avg_suggestions']:<12.0f} {data['build_time']:<10.3f}")
         print("============================================================")
         ranked = rank_structures(summary)
         print("Efficiency Ranking:")
         for i, ds in enumerate(ranked, 1):
             print(f"  {i}. {ds}")
-        save_results_to_csv(summary)
+        save_results(summary, comparator.params, args.output)
+        if args.cache_size:
+            print("Result cache:")
+            for ds_name, ds in comparator.structures.items():
+                print(f"  {ds_name}: {ds.stats()}")
         comparator.plot_results(summary, "Automated Benchmark Results")
     elif args.prefix:
         results = comparator.run_single_test(args.prefix)
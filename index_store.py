@@ -0,0 +1,256 @@
+"""Versioned binary index files.
+
+Layout (all integers in the writer's native byte order, recorded in the
+manifest)::
+
+    magic (8 bytes) | version u16 | reserved u16 | reserved u32
+    manifest offset u64 | manifest length u64
+    section data, each section aligned to 8 bytes
+    manifest (UTF-8 JSON)
+
+Every file stores the sorted vocabulary as two sections: ``word_offsets``
+(``n + 1`` unsigned 64-bit offsets) and ``word_blob`` (the UTF-8 encoded
+words back to back). UTF-8 preserves code point order, so the blob can be
+binary searched as bytes. Structures may add their own flat arrays through
+``export_sections(words)`` and restore from them with
+``import_sections(sections)``; otherwise they are rebuilt with
+``bulk_insert``.
+
+``read_index`` hands ``import_sections`` memoryviews straight into the
+mapped file, so nothing is copied up front: a structure may keep a view
+(the mapping then stays open for as long as it does), copy it with
+``section_array`` if it needs to modify it, or decode the vocabulary with
+``decode_words`` if it needs the words as strings.
+"""
+import bisect
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b'NLPIDX\x00\x00'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('=8sHHIQQ')
+
+
+def _encode_words(words):
+    offsets = array('Q', [0])
+    blob = bytearray()
+    for word in words:
+        blob += word.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, array('B', blob)
+
+
+def write_index(ds, filename: str, corpus_hash: str = None):
+    words = ds.search('')
+    sections = {}
+    sections['word_offsets'], sections['word_blob'] = _encode_words(words)
+    if hasattr(ds, 'export_sections'):
+        sections.update(ds.export_sections(words))
+
+    # The index is written to a temporary file and moved over ``filename``
+    # in one step: a process that still has the old file mapped keeps its
+    # inode instead of faulting on a file truncated under it.
+    table = {}
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.tmp-', delete=False) as f:
+        try:
+            f.write(b'\x00' * _HEADER.size)
+            for name, data in sections.items():
+                f.write(b'\x00' * (-f.tell() % 8))
+                table[name] = [f.tell(), len(data), data.typecode]
+                data.tofile(f)
+            manifest = json.dumps({
+                'format': FORMAT_VERSION,
+                'structure': type(ds).__name__,
+                'byteorder': sys.byteorder,
+                'count': len(words),
+                'corpus_hash': corpus_hash,
+                'sections': table,
+            }).encode('utf-8')
+            manifest_offset = f.tell()
+            f.write(manifest)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0,
+                                 manifest_offset, len(manifest)))
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, filename)
+
+
+def _manifest_location(header) -> tuple[int, int]:
+    if len(header) < _HEADER.size:
+        raise ValueError("not an index file")
+    magic, version, _, _, offset, length = _HEADER.unpack_from(header, 0)
+    if magic != MAGIC:
+        raise ValueError("not an index file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported index format version {version}")
+    return offset, length
+
+
+def _parse_manifest(data: bytes) -> dict:
+    manifest = json.loads(data)
+    if manifest['byteorder'] != sys.byteorder:
+        raise ValueError("index was written with a different byte order")
+    return manifest
+
+
+def _read_manifest(buffer) -> dict:
+    offset, length = _manifest_location(buffer)
+    return _parse_manifest(bytes(buffer[offset:offset + length]))
+
+
+def read_manifest(filename: str) -> dict:
+    """Return the manifest of ``filename`` without mapping its sections.
+
+    Raises ValueError if the file is not an index of the current format
+    version.
+    """
+    with open(filename, 'rb') as f:
+        offset, length = _manifest_location(f.read(_HEADER.size))
+        f.seek(offset)
+        return _parse_manifest(f.read(length))
+
+
+def _section_views(buffer, manifest) -> dict:
+    view = memoryview(buffer)
+    sections = {}
+    for name, (offset, count, typecode) in manifest['sections'].items():
+        itemsize = array(typecode).itemsize
+        sections[name] = view[offset:offset + count * itemsize].cast(typecode)
+    return sections
+
+
+def decode_words(sections) -> list[str]:
+    """The sorted vocabulary stored in ``sections`` as strings."""
+    offsets = sections['word_offsets'].tolist()
+    blob = sections['word_blob'].tobytes()
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+            for i in range(len(offsets) - 1)]
+
+
+def section_array(view) -> array:
+    """Modifiable copy of a mapped section."""
+    data = array(view.format)
+    data.frombytes(view.cast('B'))
+    return data
+
+
+def read_index(cls, filename: str):
+    with open(filename, 'rb') as f:
+        # The mapping outlives the file object; it is released once no
+        # section view is referenced any more.
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    manifest = _read_manifest(mapped)
+    if manifest['structure'] != cls.__name__:
+        raise ValueError(
+            f"index holds a {manifest['structure']}, not a {cls.__name__}")
+    sections = _section_views(mapped, manifest)
+    ds = cls()
+    # Restoring allocates many objects that all stay alive, so the cyclic
+    # collector would only repeat passes over them; it is paused meanwhile.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if hasattr(ds, 'import_sections'):
+            ds.import_sections(sections)
+        else:
+            ds.bulk_insert(decode_words(sections))
+    finally:
+        if enabled:
+            gc.enable()
+    return ds
+
+
+class MappedIndex:
+    """Read-only prefix index served straight from a memory-mapped file.
+
+    Opening costs one ``mmap`` and a manifest parse; queries binary search
+    the mapped offsets and blob, so no Python node objects are built.
+    """
+
+    def __init__(self, filename: str):
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.manifest = _read_manifest(self._mmap)
+        self.structure = self.manifest['structure']
+        self._sections = _section_views(self._mmap, self.manifest)
+        self._offsets = self._sections['word_offsets']
+        self._blob = self._sections['word_blob']
+        self.word_count = self.manifest['count']
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in self._sections.values():
+            view.release()
+        self._sections = {}
+        self._mmap.close()
+        self._file.close()
+
+    def _key(self, index: int) -> bytes:
+        return self._blob[self._offsets[index]:self._offsets[index + 1]].tobytes()
+
+    def word_at(self, index: int) -> str:
+        return self._key(index).decode('utf-8')
+
+    def _words(self, start: int, end: int) -> list[str]:
+        base = self._offsets[start]
+        chunk = self._blob[base:self._offsets[end]].tobytes()
+        bounds = [offset - base for offset in self._offsets[start:end + 1]]
+        return [chunk[bounds[i]:bounds[i + 1]].decode('utf-8')
+                for i in range(end - start)]
+
+    def _range(self, prefix: str, lo: int = 0) -> tuple[int, int]:
+        key = prefix.encode('utf-8')
+        start = bisect.bisect_left(range(self.word_count), key, lo, key=self._key)
+        if not key:
+            return start, self.word_count
+        # UTF-8 never contains 0xff, so bumping the last byte gives the
+        # smallest key above every word starting with the prefix.
+        successor = key[:-1] + bytes([key[-1] + 1])
+        end = bisect.bisect_left(range(self.word_count), successor, start, key=self._key)
+        return start, end
+
+    def search(self, prefix: str) -> list[str]:
+        return self._words(*self._range(prefix))
+
+    def search_many(self, prefixes) -> dict:
+        # Sorted prefixes have non-decreasing lower bounds, so each bisect
+        # starts where the previous one ended.
+        results = {}
+        start = 0
+        for prefix in sorted(set(prefixes)):
+            start, end = self._range(prefix, start)
+            results[prefix] = self._words(start, end)
+        return results
+
+    def mem_usage(self) -> float:
+        return len(self._mmap) / 1024  # Mapped, not necessarily resident
+
+    def complexity(self) -> dict:
+        return {
+            'time': 'O(m log n + k)',
+            'space': 'O(n)'
+        }
+
+
+def open_index(filename: str) -> MappedIndex:
+    return MappedIndex(filename)
@@ -0,0 +1,122 @@
+from collections import Counter
+
+from trie import Trie
+from utils import TOKEN_PATTERN, iter_token_lines
+
+
+class NGramIndex:
+    """Phrase completion from n-gram counts, one frequency-ranked Trie per
+    n-gram order.
+
+    ``tries[order]`` holds every kept n-gram of ``order`` words as a
+    space-joined key with its count, so the top-k cache of the node reached
+    by "data str" in the bigram trie already holds the most frequent
+    "data str..." bigrams. A query uses the last ``n - 1`` complete words as
+    context and backs off to shorter contexts (down to plain word
+    completion) until ``k`` suggestions are found.
+
+    Counting is streamed: while a batch of lines is counted, the table is
+    pruned whenever it exceeds ``max_entries``, dropping n-grams below a
+    rising count floor (as in lossy counting, so counts of n-grams that were
+    pruned and reappeared are underestimates). Only n-grams seen at least
+    ``min_count`` times are inserted.
+    """
+
+    def __init__(self, n: int = 3, min_count: int = 2, top_k: int = 10,
+                 max_entries: int = 1_000_000):
+        self.n = n
+        self.min_count = min_count
+        self.top_k = top_k
+        self.max_entries = max_entries
+        self.tries = {order: Trie(top_k) for order in range(1, n + 1)}
+        self.prune_floor = 0  # Highest floor pruning had to use
+
+    def _prune(self, counts: Counter) -> Counter:
+        floor = self.min_count
+        while True:
+            counts = Counter({gram: count for gram, count in counts.items()
+                              if count >= floor})
+            if len(counts) <= self.max_entries * 3 // 4:
+                break
+            floor += 1
+        self.prune_floor = max(self.prune_floor, floor)
+        return counts
+
+    def add_lines(self, token_lines):
+        """Count the n-grams of ``token_lines`` (an iterable of token lists,
+        consumed once) and add the frequent ones to the index."""
+        counts = Counter()
+        for tokens in token_lines:
+            for end in range(1, len(tokens) + 1):
+                for order in range(1, min(self.n, end) + 1):
+                    counts[' '.join(tokens[end - order:end])] += 1
+            if len(counts) > self.max_entries:
+                counts = self._prune(counts)
+        for gram, count in counts.items():
+            if count >= self.min_count:
+                self.tries[gram.count(' ') + 1].insert(gram, count)
+
+    def build_from_file(self, filename: str):
+        self.add_lines(iter_token_lines(filename))
+        return self
+
+    def next_words(self, context: str, k: int = None) -> list[tuple[str, int]]:
+        """Ranked ``(word, count)`` continuations of the complete words in
+        ``context`` (its last ``n - 1`` words are used)."""
+        words = [match.group().lower() for match in TOKEN_PATTERN.finditer(context)]
+        words = words[-(self.n - 1):] if self.n > 1 else []
+        if not words:
+            return []
+        trie = self.tries[len(words) + 1]
+        key = ' '.join(words) + ' '
+        return [(phrase[len(key):], trie.frequency(phrase))
+                for phrase in trie.search(key, k=k or self.top_k)]
+
+    def complete(self, text: str, k: int = None) -> list[str]:
+        """Suggestions for ``text`` with its last (partial) word completed,
+        or with a next word appended when ``text`` ends in whitespace."""
+        k = k or self.top_k
+        matches = list(TOKEN_PATTERN.finditer(text))
+        if text[-1:].isspace() or not matches or matches[-1].end() < len(text.rstrip()):
+            head, partial = text, ''
+            if not head[-1:].isspace():
+                head += ' '
+            context = [match.group().lower() for match in matches]
+        else:
+            head, partial = text[:matches[-1].start()], matches[-1].group().lower()
+            context = [match.group().lower() for match in matches[:-1]]
+        if not partial and not context:
+            return []
+
+        suggestions = []
+        seen = set()
+        # A next word needs at least one context word: backing off to plain
+        # unigrams would suggest any frequent word ("data" -> "data data").
+        lowest = 0 if partial else 1
+        for order in range(min(len(context), self.n - 1), lowest - 1, -1):
+            key_words = context[len(context) - order:] if order else []
+            key = ' '.join(key_words + [partial])  # Ends in a space if no partial
+            skip = len(key) - len(partial)
+            for phrase in self.tries[order + 1].search(key, k=k):
+                word = phrase[skip:]
+                if word not in seen:
+                    seen.add(word)
+                    suggestions.append(head + word)
+            if len(suggestions) >= k:
+                break
+        return suggestions[:k]
+
+    def search(self, prefix: str) -> list[str]:
+        return self.complete(prefix)
+
+    def node_count(self) -> int:
+        return sum(trie.node_count() for trie in self.tries.values())
+
+    def mem_usage(self) -> float:
+        return sum(trie.mem_usage() for trie in self.tries.values())
+
+    def complexity(self) -> dict:
+        return {
+            'time': 'O(L + k)',
+            'space': 'O(kept n-grams * L)'
+        }
@@ -0,0 +1,40 @@
+import bisect
+
+
+def prefix_successor(prefix: str) -> str:
+    """Smallest string greater than every string starting with ``prefix``,
+    or None if there is none (``prefix`` is empty or all U+10FFFF)."""
+    while prefix and prefix[-1] == '\U0010ffff':
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_range(words, prefix: str, lo: int = 0) -> tuple[int, int]:
+    """``(start, end)`` such that ``words[start:end]`` are the words of the
+    sorted sequence ``words`` (from ``lo`` on) starting with ``prefix``."""
+    start = bisect.bisect_left(words, prefix, lo)
+    successor = prefix_successor(prefix)
+    if successor is None:
+        return start, len(words)
+    return start, bisect.bisect_left(words, successor, start)
+
+
+def search_many_by_slicing(search, prefixes) -> dict:
+    """Answer ``prefixes`` with ``search`` (which returns sorted
+    completions), in sorted order: a prefix that extends an earlier one is
+    sliced out of that one's completions rather than searched again."""
+    results = {}
+    collected = []
+    for prefix in sorted(set(prefixes)):
+        while collected and not prefix.startswith(collected[-1][0]):
+            collected.pop()
+        if collected:
+            words = collected[-1][1]
+            start, end = prefix_range(words, prefix)
+            results[prefix] = words[start:end]
+        else:
+            results[prefix] = search(prefix)
+            collected.append((prefix, results[prefix]))
+    return results
@@ -0,0 +1,194 @@
+import sys
+from array import array
+
+from index_store import section_array
+from prefix_search import search_many_by_slicing
+
+
+def _label_size(label: str) -> int:
+    # CPython shares the empty string and one-character Latin-1 strings, so
+    # such labels add nothing per node.
+    if len(label) < 2 and label <= '\xff':
+        return 0
+    return sys.getsizeof(label)
+
+
+class RadixTrie:
+    """Compressed (Patricia) trie with array-backed node storage.
+
+    Single-child chains are merged into edge labels. Node ``i`` is described
+    by ``labels[i]`` (the edge label leading into it), ``is_end[i]``,
+    ``first_child[i]`` and ``next_sibling[i]``; siblings are kept sorted by
+    the first character of their label, so traversal yields sorted words.
+    """
+
+    __slots__ = ('labels', 'is_end', 'first_child', 'next_sibling',
+                 'word_count', 'label_bytes')
+
+    def __init__(self):
+        self.labels = ['']
+        self.is_end = array('b', [0])
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.word_count = 0
+        self.label_bytes = 0  # Kept current so mem_usage is O(1)
+
+    def _new_node(self, label: str, is_end: int = 0, first_child: int = -1) -> int:
+        self.labels.append(label)
+        self.label_bytes += _label_size(label)
+        self.is_end.append(is_end)
+        self.first_child.append(first_child)
+        self.next_sibling.append(-1)
+        return len(self.labels) - 1
+
+    def _find_child(self, node: int, char: str) -> int:
+        child = self.first_child[node]
+        labels = self.labels
+        while child != -1:
+            first = labels[child][0]
+            if first == char:
+                return child
+            if first > char:
+                return -1
+            child = self.next_sibling[child]
+        return -1
+
+    def _add_child(self, parent: int, child: int):
+        char = self.labels[child][0]
+        prev = -1
+        cur = self.first_child[parent]
+        while cur != -1 and self.labels[cur][0] < char:
+            prev = cur
+            cur = self.next_sibling[cur]
+        self.next_sibling[child] = cur
+        if prev == -1:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[prev] = child
+
+    def _split(self, node: int, at: int):
+        # Push the tail of the label into a new child that inherits the
+        # node's children and end flag; ``node`` keeps its index, so the
+        # parent's links stay valid.
+        label = self.labels[node]
+        tail = self._new_node(label[at:], self.is_end[node],
+                              self.first_child[node])
+        self.labels[node] = label[:at]
+        self.label_bytes += _label_size(label[:at]) - _label_size(label)
+        self.is_end[node] = 0
+        self.first_child[node] = tail
+
+    def insert(self, word: str):
+        node = 0
+        i = 0
+        while i < len(word):
+            child = self._find_child(node, word[i])
+            if child == -1:
+                self._add_child(node, self._new_node(word[i:], 1))
+                self.word_count += 1
+                return
+            label = self.labels[child]
+            j = 0
+            limit = min(len(label), len(word) - i)
+            while j < limit and label[j] == word[i + j]:
+                j += 1
+            if j < len(label):
+                self._split(child, j)
+            node = child
+            i += j
+        if not self.is_end[node]:
+            self.is_end[node] = 1
+            self.word_count += 1
+
+    def _locate(self, prefix: str):
+        """Return ``(node, text)`` where ``text`` spells the path to ``node``
+        and starts with ``prefix``, or ``(-1, '')`` if nothing matches."""
+        node = 0
+        i = 0
+        while i < len(prefix):
+            child = self._find_child(node, prefix[i])
+            if child == -1:
+                return -1, ''
+            label = self.labels[child]
+            rest = prefix[i:]
+            if len(label) >= len(rest):
+                if not label.startswith(rest):
+                    return -1, ''
+                return child, prefix[:i] + label
+            if not rest.startswith(label):
+                return -1, ''
+            node = child
+            i += len(label)
+        return node, prefix
+
+    def search(self, prefix: str) -> list[str]:
+        node, text = self._locate(prefix)
+        if node == -1:
+            return []
+        suggestions = []
+        self._collect_words(node, text, suggestions)
+        return suggestions
+
+    def search_many(self, prefixes) -> dict:
+        return search_many_by_slicing(self.search, prefixes)
+
+    def _collect_words(self, node: int, current_prefix: str, suggestions: list):
+        # Children are pushed in reverse sibling order so words pop sorted.
+        stack = [(node, current_prefix)]
+        while stack:
+            node, current_prefix = stack.pop()
+            if self.is_end[node]:
+                suggestions.append(current_prefix)
+            children = []
+            child = self.first_child[node]
+            while child != -1:
+                children.append((child, current_prefix + self.labels[child]))
+                child = self.next_sibling[child]
+            stack.extend(reversed(children))
+
+    def bulk_insert(self, words):
+        for word in words:
+            self.insert(word)
+
+    def export_sections(self, words) -> dict:
+        offsets = array('Q', [0])
+        blob = bytearray()
+        for label in self.labels:
+            blob += label.encode('utf-8')
+            offsets.append(len(blob))
+        return {
+            'label_offsets': offsets,
+            'label_blob': array('B', blob),
+            'is_end': self.is_end,
+            'first_child': self.first_child,
+            'next_sibling': self.next_sibling,
+        }
+
+    def import_sections(self, sections):
+        offsets = sections['label_offsets'].tolist()
+        blob = sections['label_blob'].tobytes()
+        self.labels = [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+                       for i in range(len(offsets) - 1)]
+        self.label_bytes = sum(map(_label_size, self.labels))
+        # Inserts append to the node arrays, so they are copied off the map.
+        self.is_end = section_array(sections['is_end'])
+        self.first_child = section_array(sections['first_child'])
+        self.next_sibling = section_array(sections['next_sibling'])
+        self.word_count = len(sections['word_offsets']) - 1
+
+    def node_count(self) -> int:
+        return len(self.labels)
+
+    def mem_usage(self) -> float:
+        # Flat arrays plus the label strings themselves.
+        size = (self.is_end.itemsize * len(self.is_end) +
+                self.first_child.itemsize * len(self.first_child) +
+                self.next_sibling.itemsize * len(self.next_sibling) +
+                sys.getsizeof(self.labels) + self.label_bytes)
+        return size / 1024  # Convert to KB
+
+    def complexity(self) -> dict:
+        return {
+            'time': 'O(L)',
+            'space': 'O(N)'
+        }
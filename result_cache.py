@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+
+from prefix_search import prefix_range
+
+
+class CachedStructure:
+    """Bounded LRU (optionally TTL) cache of search results around any
+    structure.
+
+    A miss on a plain ``search(prefix)`` first looks for a cached, still
+    valid result for a shorter prefix and slices it, since every completion
+    of ``prefix`` is also a completion of its prefixes. ``insert``/``delete``
+    only invalidate entries for prefixes of the changed word; ``bulk_insert``
+    clears the cache. Any other attribute is passed through to the wrapped
+    structure.
+    """
+
+    def __init__(self, ds, maxsize: int = 1024, ttl: float = None, clock=time.monotonic):
+        self.ds = ds
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # (prefix, options) -> (results, expires)
+        self._by_prefix = {}  # prefix -> set of keys, for invalidation
+        self.hits = 0
+        self.derived_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        ds = self.__dict__.get('ds')
+        if ds is None:
+            raise AttributeError(name)
+        return getattr(ds, name)
+
+    def _lookup(self, key):
+        # The live ``(results, expires)`` entry for ``key``, or None.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires = entry[1]
+        if expires is not None and expires <= self.clock():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _expiry(self):
+        return self.clock() + self.ttl if self.ttl is not None else None
+
+    def _store(self, key, results, expires):
+        if key not in self._entries:
+            self._by_prefix.setdefault(key[0], set()).add(key)
+        self._entries[key] = (results, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key):
+        del self._entries[key]
+        keys = self._by_prefix.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_prefix[key[0]]
+
+    def _derive(self, prefix: str):
+        # Longest cached shorter prefix first: it yields the smallest slice.
+        # The slice keeps the source entry's expiry, as it holds its data.
+        for length in range(len(prefix) - 1, -1, -1):
+            entry = self._lookup((prefix[:length], ()))
+            if entry is not None:
+                cached, expires = entry
+                start, end = prefix_range(cached, prefix)
+                return cached[start:end], expires
+        return None
+
+    def search(self, prefix: str, **kwargs) -> list[str]:
+        key = (prefix, tuple(sorted(kwargs.items())))
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return list(entry[0])
+        if not kwargs:
+            derived = self._derive(prefix)
+            if derived is not None:
+                self.derived_hits += 1
+                self._store(key, *derived)
+                return list(derived[0])
+        self.misses += 1
+        results = self.ds.search(prefix, **kwargs)
+        self._store(key, list(results), self._expiry())
+        return results
+
+    def search_many(self, prefixes) -> dict:
+        results = {}
+        missing = []
+        for prefix in sorted(set(prefixes)):
+            entry = self._lookup((prefix, ()))
+            if entry is None:
+                missing.append(prefix)
+            else:
+                self.hits += 1
+                results[prefix] = list(entry[0])
+        if missing:
+            self.misses += len(missing)
+            expires = self._expiry()
+            for prefix, words in self.ds.search_many(missing).items():
+                self._store((prefix, ()), list(words), expires)
+                results[prefix] = words
+        return results
+
+    def invalidate(self, word: str):
+        """Drop every cached result that ``word`` can appear in."""
+        for length in range(len(word) + 1):
+            for key in list(self._by_prefix.get(word[:length], ())):
+                self._discard(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_prefix.clear()
+
+    def insert(self, word: str, *args, **kwargs):
+        self.invalidate(word)
+        return self.ds.insert(word, *args, **kwargs)
+
+    def delete(self, word: str, *args, **kwargs):
+        self.invalidate(word)
+        return self.ds.delete(word, *args, **kwargs)
+
+    def bulk_insert(self, words, *args, **kwargs):
+        self.clear()
+        return self.ds.bulk_insert(words, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'derived_hits': self.derived_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
+
+    def mem_usage(self) -> float:
+        return self.ds.mem_usage()
+
+    def complexity(self) -> dict:
+        return self.ds.complexity()
@@ -1,80 +1,417 @@
-class SegmentTreeNode:
-    def __init__(self, start, end, words):
-        self.start = start
-        self.end = end
-        self.left = None
-        self.right = None
-        self.words = words
-        self.min_word = words[0]
-        self.max_word = words[-1]
+import bisect
+import sys
+from array import array
+from collections import Counter
+
+from index_store import decode_words
+from prefix_search import prefix_successor
+
+
+def _min(a, b):
+    return b if a is None or (b is not None and b < a) else a
+
+
+def _max(a, b):
+    return b if a is None or (b is not None and b > a) else a
 
 
 class SegmentTree:
-    def __init__(self):
-        self.words = []
-        self.root = None
+    """Segment tree over a bucketed, sorted vocabulary stored in flat arrays.
 
-    def _build(self, start, end):
-        if start > end:
-            return None
-        if start == end:
-            return SegmentTreeNode(start, end, [self.words[start]])
-        mid = (start + end) // 2
-        left = self._build(start, mid)
-        right = self._build(mid + 1, end)
-        node = SegmentTreeNode(start, end, self.words[start:end+1])
-        node.left = left
-        node.right = right
-        node.min_word = self.words[start]
-        node.max_word = self.words[end]
-        return node
-
-    def bulk_insert(self, words):
+    The words live in ``buckets``: sorted lists of at most ``2 * load``
+    words, laid out left to right. Leaf ``size + j`` summarises bucket ``j``
+    and node ``i`` has children ``2i`` and ``2i + 1``, so every node's range
+    is implied by its index and only its min/max keys and word count are
+    stored. Leaves past the last bucket are free slots holding ``None``.
+
+    Every word also carries numeric ``attributes`` (by default its corpus
+    frequency and a sentiment score), kept in ``columns`` parallel to the
+    buckets. Each node stores the sum/min/max of every attribute, so
+    aggregates over a lexical or prefix range cost O(log n + load).
+
+    An insert or delete touches one bucket and its root path. Splitting a
+    full bucket (or dropping an empty one) shifts only the leaves to its
+    right and refreshes their ancestors; the whole tree is reallocated only
+    when it runs out of free leaves.
+    """
+
+    def __init__(self, load: int = 64, attributes=('frequency', 'sentiment')):
+        self.load = load
+        self.attributes = tuple(attributes)
+        self.buckets = []
+        self.columns = {name: [] for name in self.attributes}
+        self.size = 0
+        self.min_key = []
+        self.max_key = []
+        self.count = []
+        self.sums = {}
+        self.mins = {}
+        self.maxs = {}
+        self.word_bytes = 0  # Kept current so mem_usage is O(1)
+
+    def __len__(self) -> int:
+        return self.count[1] if self.buckets else 0
+
+    def __iter__(self):
+        for bucket in self.buckets:
+            yield from bucket
+
+    @property
+    def words(self) -> list[str]:
+        return list(self)
+
+    def _build(self):
+        size = 1
+        while size < len(self.buckets):
+            size *= 2
+        self.size = size
+        self.min_key = [None] * (2 * size)
+        self.max_key = [None] * (2 * size)
+        self.count = [0] * (2 * size)
+        for name in self.attributes:
+            self.sums[name] = [0] * (2 * size)
+            self.mins[name] = [None] * (2 * size)
+            self.maxs[name] = [None] * (2 * size)
+        self._refresh(0, len(self.buckets))
+
+    def _pull(self, node: int):
+        left, right = 2 * node, 2 * node + 1
+        self.min_key[node] = self.min_key[left]
+        self.max_key[node] = (self.max_key[right] if self.max_key[right] is not None
+                              else self.max_key[left])
+        self.count[node] = self.count[left] + self.count[right]
+        for name in self.attributes:
+            sums, mins, maxs = self.sums[name], self.mins[name], self.maxs[name]
+            sums[node] = sums[left] + sums[right]
+            mins[node] = _min(mins[left], mins[right])
+            maxs[node] = _max(maxs[left], maxs[right])
+
+    def _set_leaf(self, index: int):
+        leaf = self.size + index
+        if index < len(self.buckets):
+            bucket = self.buckets[index]
+            self.min_key[leaf] = bucket[0]
+            self.max_key[leaf] = bucket[-1]
+            self.count[leaf] = len(bucket)
+            for name in self.attributes:
+                column = self.columns[name][index]
+                self.sums[name][leaf] = sum(column)
+                self.mins[name][leaf] = min(column)
+                self.maxs[name][leaf] = max(column)
+        else:
+            self.min_key[leaf] = None
+            self.max_key[leaf] = None
+            self.count[leaf] = 0
+            for name in self.attributes:
+                self.sums[name][leaf] = 0
+                self.mins[name][leaf] = None
+                self.maxs[name][leaf] = None
+
+    def _refresh(self, start: int, end: int):
+        """Recompute leaves ``start..end-1`` and every ancestor above them."""
+        for index in range(start, end):
+            self._set_leaf(index)
+        lo, hi = self.size + start, self.size + end - 1
+        while lo > 1:
+            lo //= 2
+            hi //= 2
+            for node in range(lo, hi + 1):
+                self._pull(node)
+
+    def _update_path(self, index: int):
+        self._set_leaf(index)
+        node = (self.size + index) // 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def _find_bucket(self, key: str) -> tuple[int, int]:
+        """Return ``(bucket, rank)``: the first bucket whose max key is >= key
+        (or ``len(buckets)``) and the number of words in earlier buckets."""
+        if not self.buckets or self.max_key[1] < key:
+            return len(self.buckets), len(self)
+        node = 1
+        rank = 0
+        max_key = self.max_key
+        while node < self.size:
+            node *= 2
+            if max_key[node] is None or max_key[node] < key:
+                rank += self.count[node]
+                node += 1
+        return node - self.size, rank
+
+    def _lower_bound(self, key: str) -> tuple[int, int, int]:
+        """Return ``(bucket, offset, rank)`` of the first word >= key."""
+        index, rank = self._find_bucket(key)
+        if index == len(self.buckets):
+            return index, 0, rank
+        offset = bisect.bisect_left(self.buckets[index], key)
+        return index, offset, rank + offset
+
+    def bulk_insert(self, words, values=None):
+        """Insert ``words``; repeated words add to their frequency, and a
+        Counter is taken as frequencies. ``values`` optionally maps a word to
+        a dict of attribute values to set."""
         if not words:
             return
-        self.words = sorted(list(set(words)))  # unique + sorted
-        self.root = self._build(0, len(self.words) - 1)
+        counts = Counter(words)
+        merged = sorted(set(self).union(counts))  # unique + sorted
+        load = self.load
+        for name in self.attributes:
+            current = {}
+            for bucket, column in zip(self.buckets, self.columns[name]):
+                current.update(zip(bucket, column))
+            column = []
+            for word in merged:
+                value = current.get(word, 0)
+                if name == 'frequency':
+                    value += counts.get(word, 0)
+                if values and word in values and name in values[word]:
+                    value = values[word][name]
+                column.append(value)
+            self.columns[name] = [column[i:i + load] for i in range(0, len(column), load)]
+        self.buckets = [merged[i:i + load] for i in range(0, len(merged), load)]
+        self.word_bytes = sum(map(sys.getsizeof, merged))
+        self._build()
 
-    def insert(self, word):
-        if not word:
-            return
-        if word not in self.words:
-            self.words.append(word)
-            self.words.sort()
-            self.root = self._build(0, len(self.words) - 1)
+    def export_sections(self, words) -> dict:
+        sections = {}
+        for name in self.attributes:
+            values = [value for column in self.columns[name] for value in column]
+            typecode = 'q' if all(isinstance(value, int) for value in values) else 'd'
+            sections['attribute:' + name] = array(typecode, values)
+        return sections
 
-    def search(self, prefix: str):
-        results = []
-        self._search_recursive(self.root, prefix, results)
-        return sorted(set(results))
+    def import_sections(self, sections):
+        words = decode_words(sections)
+        load = self.load
+        self.buckets = [words[i:i + load] for i in range(0, len(words), load)]
+        self.word_bytes = sum(map(sys.getsizeof, words))
+        for name in self.attributes:
+            values = sections.get('attribute:' + name)
+            values = values.tolist() if values is not None else [0] * len(words)
+            self.columns[name] = [values[i:i + load] for i in range(0, len(values), load)]
+        if self.buckets:
+            self._build()
 
-    def _search_recursive(self, node, prefix, results):
-        if not node:
+    def insert(self, word, **values):
+        if not word:
             return
-        if node.max_word < prefix or node.min_word > prefix:
+        # A new word has been seen once unless told otherwise.
+        row = {name: values.get(name, 1 if name == 'frequency' else 0)
+               for name in self.attributes}
+        if not self.buckets:
+            self.word_bytes += sys.getsizeof(word)
+            self.buckets.append([word])
+            for name in self.attributes:
+                self.columns[name].append([row[name]])
+            self._build()
             return
-
-        if all(w.startswith(prefix) for w in node.words):
-            results.extend(node.words)
+        index, _ = self._find_bucket(word)
+        if index == len(self.buckets):
+            index -= 1
+        bucket = self.buckets[index]
+        offset = bisect.bisect_left(bucket, word)
+        if offset < len(bucket) and bucket[offset] == word:
+            # Seen again: as in bulk_insert, its frequency grows by this
+            # occurrence's count, and other given attributes are set.
+            for name in self.attributes:
+                if name == 'frequency':
+                    self.columns[name][index][offset] += row[name]
+                elif name in values:
+                    self.columns[name][index][offset] = values[name]
+            self._update_path(index)
             return
+        bucket.insert(offset, word)
+        self.word_bytes += sys.getsizeof(word)
+        for name in self.attributes:
+            self.columns[name][index].insert(offset, row[name])
+        if len(bucket) <= 2 * self.load:
+            self._update_path(index)
+            return
+        half = len(bucket) // 2
+        self.buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+        for name in self.attributes:
+            column = self.columns[name][index]
+            self.columns[name][index:index + 1] = [column[:half], column[half:]]
+        if len(self.buckets) > self.size:
+            self._build()
+        else:
+            self._refresh(index, len(self.buckets))
+
+    def delete(self, word):
+        index, offset, _ = self._lower_bound(word)
+        if index == len(self.buckets):
+            return False
+        bucket = self.buckets[index]
+        if offset == len(bucket) or bucket[offset] != word:
+            return False
+        del bucket[offset]
+        self.word_bytes -= sys.getsizeof(word)
+        for name in self.attributes:
+            del self.columns[name][index][offset]
+        if bucket:
+            self._update_path(index)
+        else:
+            del self.buckets[index]
+            for name in self.attributes:
+                del self.columns[name][index]
+            self._refresh(index, len(self.buckets) + 1)
+        return True
+
+    def _position(self, word: str):
+        index, offset, _ = self._lower_bound(word)
+        if index < len(self.buckets):
+            bucket = self.buckets[index]
+            if offset < len(bucket) and bucket[offset] == word:
+                return index, offset
+        return None
+
+    def get(self, word: str) -> dict:
+        """Return the attribute values of ``word``, or None if absent."""
+        position = self._position(word)
+        if position is None:
+            return None
+        index, offset = position
+        return {name: self.columns[name][index][offset] for name in self.attributes}
+
+    def update(self, word: str, **values) -> bool:
+        """Point update of ``word``'s attributes in O(log n + load)."""
+        position = self._position(word)
+        if position is None:
+            return False
+        index, offset = position
+        for name, value in values.items():
+            self.columns[name][index][offset] = value
+        self._update_path(index)
+        return True
+
+    def range_query(self, low: str = None, high: str = None,
+                    attribute: str = 'frequency') -> dict:
+        """Aggregate ``attribute`` over words ``w`` with ``low <= w < high``
+        (``None`` leaves that side unbounded)."""
+        result = {'count': 0, 'sum': 0, 'min': None, 'max': None}
+        if not self.buckets:
+            return result
+        if low is None:
+            start_index, start_offset = 0, 0
+        else:
+            start_index, start_offset, _ = self._lower_bound(low)
+        if high is None:
+            end_index, end_offset = len(self.buckets), 0
+        else:
+            end_index, end_offset, _ = self._lower_bound(high)
+        if (start_index, start_offset) >= (end_index, end_offset):
+            return result
+
+        columns = self.columns[attribute]
+
+        def add_values(values):
+            if values:
+                result['count'] += len(values)
+                result['sum'] += sum(values)
+                result['min'] = _min(result['min'], min(values))
+                result['max'] = _max(result['max'], max(values))
+
+        if start_index == end_index:
+            add_values(columns[start_index][start_offset:end_offset])
+            return result
+        add_values(columns[start_index][start_offset:])
+        if end_index < len(self.buckets):
+            add_values(columns[end_index][:end_offset])
+
+        # Whole buckets in between come from the tree, bottom-up.
+        sums, mins, maxs = self.sums[attribute], self.mins[attribute], self.maxs[attribute]
+
+        def add_node(node):
+            result['count'] += self.count[node]
+            result['sum'] += sums[node]
+            result['min'] = _min(result['min'], mins[node])
+            result['max'] = _max(result['max'], maxs[node])
+
+        lo = self.size + start_index + 1
+        hi = self.size + end_index
+        while lo < hi:
+            if lo & 1:
+                add_node(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                add_node(hi)
+            lo //= 2
+            hi //= 2
+        return result
+
+    def prefix_query(self, prefix: str, attribute: str = 'frequency') -> dict:
+        """Aggregate ``attribute`` over the words starting with ``prefix``."""
+        return self.range_query(prefix, prefix_successor(prefix), attribute)
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """Return ``(start, end)`` such that words ``start..end-1`` in sorted
+        order are exactly the words starting with ``prefix``."""
+        _, _, start = self._lower_bound(prefix)
+        successor = prefix_successor(prefix)
+        end = len(self) if successor is None else self._lower_bound(successor)[2]
+        return start, end
+
+    def _slice(self, index: int, offset: int, end_index: int, end_offset: int) -> list[str]:
+        # Words from position (index, offset) up to (end_index, end_offset).
+        if index == end_index:
+            return self.buckets[index][offset:end_offset] if index < len(self.buckets) else []
+        results = self.buckets[index][offset:]
+        for bucket in self.buckets[index + 1:end_index]:
+            results.extend(bucket)
+        if end_index < len(self.buckets):
+            results.extend(self.buckets[end_index][:end_offset])
+        return results
+
+    def search(self, prefix: str):
+        index, offset, _ = self._lower_bound(prefix)
+        successor = prefix_successor(prefix)
+        if successor is None:
+            return self._slice(index, offset, len(self.buckets), 0)
+        end_index, end_offset, _ = self._lower_bound(successor)
+        return self._slice(index, offset, end_index, end_offset)
 
-        for w in node.words:
-            if w.startswith(prefix):
-                results.append(w)
+    def _seek(self, key: str, index: int, offset: int) -> tuple[int, int]:
+        """Lower bound of ``key``, given that every word before position
+        ``(index, offset)`` is smaller: a bound inside that bucket is found
+        by bisecting it, otherwise the tree is descended."""
+        if index < len(self.buckets) and self.buckets[index][-1] >= key:
+            return index, bisect.bisect_left(self.buckets[index], key, offset)
+        index, offset, _ = self._lower_bound(key)
+        return index, offset
 
-        self._search_recursive(node.left, prefix, results)
-        self._search_recursive(node.right, prefix, results)
+    def search_many(self, prefixes) -> dict:
+        """Answer many prefixes in one forward sweep over the buckets: the
+        bounds of a sorted prefix (itself and its successor) that fall in
+        the current bucket are found by bisecting from the previous position
+        instead of descending."""
+        results = {}
+        index = offset = 0
+        for prefix in sorted(set(prefixes)):
+            index, offset = self._seek(prefix, index, offset)
+            successor = prefix_successor(prefix)
+            if successor is None:
+                end_index, end_offset = len(self.buckets), 0
+            else:
+                end_index, end_offset = self._seek(successor, index, offset)
+            results[prefix] = self._slice(index, offset, end_index, end_offset)
+        return results
 
-    def delete(self):
-        pass
+    def node_count(self) -> int:
+        return len(self.count)
 
     def mem_usage(self):
-        def count_nodes(node):
-            return 0 if not node else 1 + count_nodes(node.left) + count_nodes(node.right)
-        return (count_nodes(self.root) * 180) / 1024
+        # Three references per tree node and attribute aggregate, the bucket
+        # and column slots, plus the word strings themselves.
+        columns = 1 + len(self.attributes)
+        slots = ((3 + 3 * len(self.attributes)) * len(self.count) +
+                 columns * (len(self) + 8 * len(self.buckets)))
+        return (slots * 8 + self.word_bytes) / 1024
 
     def complexity(self) -> dict:
         return {
-            'time': 'O(log n)',
+            'time': 'O(log n + k)',
             'space': 'O(n)'
         }
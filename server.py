@@ -0,0 +1,237 @@
+"""Asyncio autocomplete server and load generator.
+
+Protocol: newline-delimited JSON over TCP or a Unix socket. A request is
+``{"id": ..., "prefix": "pro", "limit": 10}`` (``id`` and ``limit`` are
+optional; a bare text line is taken as the prefix) and is answered with
+``{"id": ..., "prefix": "pro", "count": n, "results": [...]}``. Requests
+on one connection may be pipelined; replies carry the request ``id`` and
+can arrive out of order. ``{"stats": true}`` returns the server counters.
+
+Structures that rank completions (a Trie, whose ``search_many`` takes
+``k``) answer a request with a ``limit`` from their top-k caches: the
+``limit`` most frequent completions, and ``count`` is the number returned.
+Other structures return the first ``limit`` completions in sorted order,
+with ``count`` the number of all matches. Undecodable bytes are replaced,
+and a line longer than the stream limit (64 KiB) is skipped and answered
+with an error.
+"""
+import asyncio
+import inspect
+import json
+import random
+import time
+
+from utils import latency_summary
+
+
+async def _read_line(reader) -> bytes:
+    """The next line from ``reader`` (``b''`` at end of stream), or None
+    if it was longer than the reader's limit; such a line is discarded up
+    to and including its newline."""
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b'\n')
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+class AutocompleteServer:
+    """Serves prefix queries from one loaded structure.
+
+    Identical prefixes in flight share one pending lookup, and distinct
+    prefixes arriving within ``batch_window`` seconds (or until
+    ``max_batch`` are queued) are answered by a single ``search_many``.
+    """
+
+    def __init__(self, ds, batch_window: float = 0.001, max_batch: int = 256):
+        self.ds = ds
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # A limited request to a ranking structure asks for its top k only.
+        self.ranked = 'k' in inspect.signature(ds.search_many).parameters
+        self._in_flight = {}  # (prefix, k) -> future shared by identical requests
+        self._queued = []
+        self._flush_handle = None
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_prefixes = 0
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'avg_batch': self.batched_prefixes / self.batches if self.batches else 0.0,
+        }
+
+    async def lookup(self, prefix: str, k: int = None) -> list[str]:
+        self.requests += 1
+        key = (prefix, k)
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await future
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self._queued.append(key)
+        if len(self._queued) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        keys, self._queued = self._queued, []
+        groups = {}  # One search_many per distinct k
+        for prefix, k in keys:
+            groups.setdefault(k, []).append(prefix)
+        for k, prefixes in groups.items():
+            self.batches += 1
+            self.batched_prefixes += len(prefixes)
+            try:
+                if k is None:
+                    results = self.ds.search_many(prefixes)
+                else:
+                    results = self.ds.search_many(prefixes, k=k)
+            except Exception as e:
+                results = None
+                error = e
+            for prefix in prefixes:
+                future = self._in_flight.pop((prefix, k))
+                if future.done():
+                    continue
+                if results is None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[prefix])
+
+    async def _answer(self, line: str, writer):
+        reply = {}
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if not isinstance(request, dict):
+                request = {'prefix': line}
+            reply['id'] = request.get('id')
+            if request.get('stats'):
+                reply['stats'] = self.stats()
+            else:
+                prefix = request.get('prefix')
+                if not isinstance(prefix, str):
+                    raise ValueError("request needs a string 'prefix'")
+                limit = request.get('limit')
+                if limit is not None and (not isinstance(limit, int) or limit < 0):
+                    raise ValueError("'limit' must be a non-negative integer")
+                results = await self.lookup(prefix, limit if self.ranked else None)
+                reply.update(prefix=prefix, count=len(results),
+                             results=results[:limit] if limit is not None else results)
+        except Exception as e:
+            reply['error'] = str(e)
+        writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+    async def handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await _read_line(reader)
+                if line is None:
+                    writer.write(json.dumps({'id': None, 'error': 'request line too long'})
+                                 .encode('utf-8') + b'\n')
+                    continue
+                if not line:
+                    break
+                line = line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+            if tasks:
+                await asyncio.gather(*tasks)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def serve(ds, host='127.0.0.1', port=8765, unix_path=None,
+                batch_window=0.001, max_batch=256):
+    server = await AutocompleteServer(ds, batch_window, max_batch).start(
+        host, port, unix_path)
+    async with server:
+        await server.serve_forever()
+
+
+async def _open(host, port, unix_path):
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_load(prefixes, requests=10000, concurrency=64, limit=10,
+                   host='127.0.0.1', port=8765, unix_path=None, seed=0) -> dict:
+    """Drive a running server with ``concurrency`` connections, each sending
+    one request at a time, and report throughput and latency percentiles."""
+    rng = random.Random(seed)
+    workload = [rng.choice(prefixes) for _ in range(requests)]
+    samples = []
+    errors = 0
+
+    async def client(share):
+        nonlocal errors
+        reader, writer = await _open(host, port, unix_path)
+        try:
+            for i, prefix in enumerate(share):
+                start_time = time.perf_counter_ns()
+                writer.write(json.dumps({'id': i, 'prefix': prefix,
+                                         'limit': limit}).encode('utf-8') + b'\n')
+                reply = json.loads(await reader.readline())
+                samples.append(time.perf_counter_ns() - start_time)
+                if 'error' in reply:
+                    errors += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client(workload[i::concurrency]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start_time
+
+    reader, writer = await _open(host, port, unix_path)
+    writer.write(b'{"stats": true}\n')
+    server_stats = json.loads(await reader.readline())['stats']
+    writer.close()
+    await writer.wait_closed()
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': len(samples) / elapsed if elapsed else 0.0,
+        'latency': latency_summary(samples),
+        'server': server_stats,
+    }
@@ -0,0 +1,121 @@
+import bisect
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from prefix_search import prefix_successor
+
+
+def _build_shard(cls, counts):
+    # Runs in a worker process; the built shard is pickled back.
+    ds = cls()
+    ds.bulk_insert(counts)
+    return ds
+
+
+def _extend_shard(ds, counts):
+    ds.bulk_insert(counts)
+    return ds
+
+
+class ShardedIndex:
+    """Index split into lexical-range shards of any structure class.
+
+    ``bulk_insert`` partitions the distinct words into ``num_shards``
+    contiguous ranges of similar size and builds the shards in parallel in a
+    ProcessPoolExecutor. Shard ``i`` holds the words ``w`` with
+    ``boundaries[i - 1] <= w < boundaries[i]``, so a prefix query only
+    visits the shards its range overlaps and their sorted results
+    concatenate in order.
+    """
+
+    def __init__(self, cls, num_shards: int = 4, workers: int = None):
+        self.cls = cls
+        self.num_shards = num_shards
+        self.workers = workers or min(num_shards, os.cpu_count() or 1)
+        self.boundaries = []
+        self.shards = []
+
+    def _run(self, function, jobs):
+        if self.workers <= 1 or len(jobs) <= 1:
+            return [function(*job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(function, *zip(*jobs)))
+
+    def _shard_for(self, word: str) -> int:
+        return bisect.bisect_right(self.boundaries, word)
+
+    def bulk_insert(self, words):
+        counts = Counter(words)
+        if not counts:
+            return
+        if not self.shards:
+            keys = sorted(counts)
+            step = -(-len(keys) // self.num_shards)  # ceil division
+            ranges = [keys[i:i + step] for i in range(0, len(keys), step)]
+            self.boundaries = [chunk[0] for chunk in ranges[1:]]
+            jobs = [(self.cls, Counter({word: counts[word] for word in chunk}))
+                    for chunk in ranges]
+            self.shards = self._run(_build_shard, jobs)
+            return
+        grouped = [Counter() for _ in self.shards]
+        for word, count in counts.items():
+            grouped[self._shard_for(word)][word] = count
+        changed = [i for i, group in enumerate(grouped) if group]
+        rebuilt = self._run(_extend_shard,
+                            [(self.shards[i], grouped[i]) for i in changed])
+        for i, shard in zip(changed, rebuilt):
+            self.shards[i] = shard
+
+    def insert(self, word: str):
+        if not self.shards:
+            self.shards = [self.cls()]
+        self.shards[self._shard_for(word)].insert(word)
+
+    def _shard_range(self, prefix: str) -> range:
+        first = self._shard_for(prefix)
+        # Later shards can only match if their lower boundary has the prefix,
+        # i.e. lies before the prefix's successor.
+        successor = prefix_successor(prefix)
+        if successor is None:
+            last = len(self.boundaries)
+        else:
+            last = bisect.bisect_left(self.boundaries, successor, first)
+        return range(first, min(last + 1, len(self.shards)))
+
+    def search(self, prefix: str, **kwargs) -> list[str]:
+        shards = [self.shards[i] for i in self._shard_range(prefix)]
+        results = []
+        for shard in shards:
+            results.extend(shard.search(prefix, **kwargs))
+        k = kwargs.get('k')
+        if k is not None and len(shards) > 1:
+            # Per-shard top-k lists are merged by frequency where available.
+            results.sort(key=lambda word: (-self._frequency(word), word))
+            results = results[:k]
+        return results
+
+    def search_many(self, prefixes) -> dict:
+        # Each shard answers its share of the batch in one call; shard
+        # results are concatenated in shard (hence lexical) order.
+        prefixes = sorted(set(prefixes))
+        results = {prefix: [] for prefix in prefixes}
+        per_shard = [[] for _ in self.shards]
+        for prefix in prefixes:
+            for i in self._shard_range(prefix):
+                per_shard[i].append(prefix)
+        for shard, shard_prefixes in zip(self.shards, per_shard):
+            if shard_prefixes:
+                for prefix, words in shard.search_many(shard_prefixes).items():
+                    results[prefix].extend(words)
+        return results
+
+    def _frequency(self, word: str) -> int:
+        shard = self.shards[self._shard_for(word)]
+        return shard.frequency(word) if hasattr(shard, 'frequency') else 0
+
+    def mem_usage(self) -> float:
+        return sum(shard.mem_usage() for shard in self.shards)
+
+    def complexity(self) -> dict:
+        return self.cls().complexity()
@@ -0,0 +1,148 @@
+import bisect
+import copy
+import heapq
+import threading
+from collections import Counter
+
+from prefix_search import prefix_range
+
+
+def _merge_unique(left, right):
+    # Both inputs are sorted; words present in both are kept once.
+    merged = []
+    for word in heapq.merge(left, right):
+        if not merged or merged[-1] != word:
+            merged.append(word)
+    return merged
+
+
+def _settle(ds):
+    # Structures that build an index lazily (SuffixTree's suffix array) do
+    # so before being published, not inside concurrent readers.
+    freeze = getattr(ds, 'freeze', None)
+    if freeze is not None:
+        freeze()
+
+
+class DeltaVersion:
+    """Immutable view of a structure that has no persistent insert: a base
+    structure that is never modified once published, plus the sorted words
+    added since (``delta``) and their counts."""
+
+    __slots__ = ('base', 'delta', 'counts')
+
+    def __init__(self, base, delta=(), counts=None):
+        self.base = base
+        self.delta = tuple(delta)
+        self.counts = counts or Counter()
+
+    def _extra(self, prefix: str) -> tuple:
+        start, end = prefix_range(self.delta, prefix)
+        return self.delta[start:end]
+
+    def search(self, prefix: str, **kwargs) -> list[str]:
+        results = self.base.search(prefix, **kwargs)
+        extra = self._extra(prefix)
+        if kwargs or not extra:
+            # Ranked (top-k) queries come from the base alone.
+            return results
+        return _merge_unique(results, extra)
+
+    def search_many(self, prefixes) -> dict:
+        results = self.base.search_many(prefixes)
+        for prefix, words in results.items():
+            extra = self._extra(prefix)
+            if extra:
+                results[prefix] = _merge_unique(words, extra)
+        return results
+
+    def find_substring(self, pattern: str) -> list[tuple[str, int]]:
+        results = self.base.find_substring(pattern)
+        if not pattern:
+            return results
+        extra = []
+        for word in self.delta:
+            pos = word.find(pattern)
+            while pos != -1:
+                extra.append((word, pos))
+                pos = word.find(pattern, pos + 1)
+        return _merge_unique(results, extra) if extra else results
+
+    def with_words(self, words, merge_threshold: int) -> 'DeltaVersion':
+        counts = self.counts.copy()
+        counts.update(words)
+        if len(counts) <= merge_threshold:
+            delta = list(self.delta)
+            for word in sorted(counts.keys() - self.counts.keys()):
+                bisect.insort(delta, word)
+            return DeltaVersion(self.base, delta, counts)
+        # Fold the delta into a private copy of the base; readers keep using
+        # the old base until the new version is published.
+        base = copy.deepcopy(self.base)
+        base.bulk_insert(counts)
+        _settle(base)
+        return DeltaVersion(base)
+
+    def mem_usage(self) -> float:
+        return self.base.mem_usage()
+
+    def complexity(self) -> dict:
+        return self.base.complexity()
+
+
+class VersionedIndex:
+    """Copy-on-write snapshots of a structure for concurrent readers.
+
+    Readers query the currently published version without taking a lock;
+    published versions are never modified. One writer at a time builds the
+    next version and publishes it by replacing a single reference, which is
+    atomic, so a reader sees either the old or the new version and never a
+    structure mid-update. ``snapshot()`` returns the current version for
+    several consistent queries.
+
+    Structures with a persistent ``inserted`` method (Trie, AVLTree) get
+    each new version by path copying. Any other structure is wrapped in a
+    DeltaVersion: new words go to a sorted delta that is merged into query
+    results, and once it holds more than ``merge_threshold`` words it is
+    folded into a copy of the base.
+    """
+
+    def __init__(self, ds, merge_threshold: int = 1024):
+        self.merge_threshold = merge_threshold
+        self.path_copying = hasattr(ds, 'inserted')
+        _settle(ds)
+        self._published = ds if self.path_copying else DeltaVersion(ds)
+        self._writer = threading.Lock()
+        self.version = 0
+
+    def snapshot(self):
+        return self._published
+
+    def search(self, prefix: str, **kwargs) -> list[str]:
+        return self._published.search(prefix, **kwargs)
+
+    def search_many(self, prefixes) -> dict:
+        return self._published.search_many(prefixes)
+
+    def find_substring(self, pattern: str) -> list[tuple[str, int]]:
+        return self._published.find_substring(pattern)
+
+    def insert(self, word: str):
+        self.bulk_insert([word])
+
+    def bulk_insert(self, words):
+        with self._writer:
+            current = self._published
+            if self.path_copying:
+                for word in words:
+                    current = current.inserted(word)
+            else:
+                current = current.with_words(words, self.merge_threshold)
+            self._published = current
+            self.version += 1
+
+    def mem_usage(self) -> float:
+        return self._published.mem_usage()
+
+    def complexity(self) -> dict:
+        return self._published.complexity()
@@ -0,0 +1,179 @@
+import bisect
+from collections import Counter
+
+import numpy as np
+
+KEY_BYTES = 8
+
+
+def _pack(words):
+    encoded = [word.encode('utf-8') for word in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(word) for word in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8).copy()
+    return blob, offsets
+
+
+def _leading_keys(blob, offsets):
+    # First KEY_BYTES bytes of every word, zero padded, as big-endian
+    # integers: integer order is byte order, so one searchsorted over the
+    # keys narrows any prefix query.
+    count = len(offsets) - 1
+    matrix = np.zeros((count, KEY_BYTES), dtype=np.uint8)
+    starts, ends = offsets[:-1], offsets[1:]
+    for j in range(KEY_BYTES):
+        index = starts + j
+        valid = index < ends
+        matrix[valid, j] = blob[index[valid]]
+    return matrix.view('>u8').ravel().astype(np.uint64)
+
+
+def _prefix_bounds(encoded):
+    """Lowest and highest possible key of a word starting with each of the
+    (at most KEY_BYTES long) ``encoded`` prefixes."""
+    low = b''.join(prefix.ljust(KEY_BYTES, b'\x00') for prefix in encoded)
+    high = b''.join(prefix.ljust(KEY_BYTES, b'\xff') for prefix in encoded)
+    return (np.frombuffer(low, dtype='>u8').astype(np.uint64),
+            np.frombuffer(high, dtype='>u8').astype(np.uint64))
+
+
+class SortedArrayIndex:
+    """Sorted vocabulary packed into NumPy arrays.
+
+    Words are stored as one UTF-8 byte buffer (``blob``) with ``n + 1``
+    ``offsets``, plus ``keys``: the first eight bytes of each word as a
+    big-endian integer. UTF-8 preserves code point order, so the range of
+    words with a given prefix is found by ``searchsorted`` over ``keys``,
+    vectorized across a whole batch of prefixes; prefixes longer than eight
+    bytes are finished with a binary search over the bytes. Words must not
+    contain NUL characters, which would collide with the key padding.
+    """
+
+    def __init__(self):
+        self.blob = np.zeros(0, dtype=np.uint8)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _word_bytes(self, index: int) -> bytes:
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+
+    def _words(self, start: int, end: int) -> list[str]:
+        base = self.offsets[start]
+        chunk = self.blob[base:self.offsets[end]].tobytes()
+        bounds = (self.offsets[start:end + 1] - base).tolist()
+        return [chunk[bounds[i]:bounds[i + 1]].decode('utf-8')
+                for i in range(end - start)]
+
+    def _rebuild(self, words):
+        self.blob, self.offsets = _pack(words)
+        self.keys = _leading_keys(self.blob, self.offsets)
+
+    def bulk_insert(self, words):
+        # ``words`` is consumed once; a Counter is taken as frequencies.
+        new = Counter(words)
+        if not new:
+            return
+        self._rebuild(sorted(set(self._words(0, len(self))) | set(new)))
+
+    def import_sections(self, sections):
+        # The stored vocabulary is this structure's own layout, so the blob
+        # and offsets are copied off the map as they are (which also keeps
+        # them writable and independent of the file) and only the keys are
+        # recomputed.
+        self.blob = np.frombuffer(sections['word_blob'], dtype=np.uint8).copy()
+        self.offsets = np.frombuffer(sections['word_offsets'], dtype=np.int64).copy()
+        self.keys = _leading_keys(self.blob, self.offsets)
+
+    def insert(self, word: str):
+        encoded = word.encode('utf-8')
+        index = self._bounds(encoded)[0]
+        if index < len(self) and self._word_bytes(index) == encoded:
+            return
+        start = self.offsets[index]
+        self.blob = np.insert(self.blob, start, np.frombuffer(encoded, dtype=np.uint8))
+        self.offsets = np.insert(self.offsets, index + 1, start + len(encoded))
+        self.offsets[index + 2:] += len(encoded)
+        key = _prefix_bounds([encoded[:KEY_BYTES]])[0]
+        self.keys = np.insert(self.keys, index, key)
+
+    def _refine(self, encoded: bytes, start: int, end: int) -> tuple[int, int]:
+        # Words in [start, end) share the first KEY_BYTES bytes with the
+        # prefix; compare the rest as bytes.
+        size = len(encoded)
+        low = bisect.bisect_left(range(start, end), encoded,
+                                 key=lambda i: self._word_bytes(i)[:size])
+        high = bisect.bisect_right(range(start, end), encoded,
+                                   key=lambda i: self._word_bytes(i)[:size])
+        return start + low, start + high
+
+    def _bounds(self, encoded: bytes) -> tuple[int, int]:
+        low_key, high_key = _prefix_bounds([encoded[:KEY_BYTES]])
+        start = int(np.searchsorted(self.keys, low_key[0], 'left'))
+        end = int(np.searchsorted(self.keys, high_key[0], 'right'))
+        if len(encoded) > KEY_BYTES:
+            start, end = self._refine(encoded, start, end)
+        return start, end
+
+    def _bounds_many(self, prefixes) -> tuple[np.ndarray, np.ndarray]:
+        encoded = [prefix.encode('utf-8') for prefix in prefixes]
+        low_keys, high_keys = _prefix_bounds([prefix[:KEY_BYTES] for prefix in encoded])
+        starts = np.searchsorted(self.keys, low_keys, 'left')
+        ends = np.searchsorted(self.keys, high_keys, 'right')
+        for i, prefix in enumerate(encoded):
+            if len(prefix) > KEY_BYTES:
+                starts[i], ends[i] = self._refine(prefix, int(starts[i]), int(ends[i]))
+        return starts, ends
+
+    def search(self, prefix: str) -> list[str]:
+        start, end = self._bounds(prefix.encode('utf-8'))
+        return self._words(start, end)
+
+    def search_many(self, prefixes) -> dict:
+        prefixes = list(dict.fromkeys(prefixes))
+        if not prefixes:
+            return {}
+        starts, ends = self._bounds_many(prefixes)
+        # Overlapping ranges (nested prefixes) are decoded once per merged
+        # span and answered by slicing the decoded words.
+        ranges = sorted(zip(starts.tolist(), ends.tolist(), prefixes))
+        results = {}
+        group = []
+        group_end = -1
+        for start, end, prefix in ranges + [(len(self) + 1, 0, None)]:
+            if start >= group_end and group:
+                group_start = group[0][0]
+                words = self._words(group_start, group_end)
+                for first, last, member in group:
+                    results[member] = words[first - group_start:last - group_start]
+                group = []
+            group.append((start, end, prefix))
+            group_end = max(group_end, end) if len(group) > 1 else end
+        return {prefix: results[prefix] for prefix in prefixes}
+
+    def count_prefix(self, prefix: str) -> int:
+        start, end = self._bounds(prefix.encode('utf-8'))
+        return end - start
+
+    def count_many(self, prefixes) -> np.ndarray:
+        """Number of words under each prefix, in input order."""
+        prefixes = list(prefixes)
+        if not prefixes:
+            return np.zeros(0, dtype=np.int64)
+        starts, ends = self._bounds_many(prefixes)
+        return ends - starts
+
+    def node_count(self) -> int:
+        return len(self.keys)
+
+    def mem_usage(self) -> float:
+        size = self.blob.nbytes + self.offsets.nbytes + self.keys.nbytes
+        return size / 1024  # Convert to KB
+
+    def complexity(self) -> dict:
+        return {
+            'time': 'O(m + log n + k)',
+            'space': 'O(n)'
+        }
@@ -1,66 +1,411 @@
 import bisect
+import gc
+import sys
+from array import array
+
+from index_store import decode_words, section_array
+from prefix_search import prefix_range
+
+SEPARATOR = '\x00'
 
 
 class SuffixTreeNode:
+    __slots__ = ('children', 'start', 'end', 'suffix_link', 'doc', 'suffix_start')
+
+    def __init__(self, start: int, end: int = None, doc: int = None):
+        # Leaves never get children, so only internal nodes carry a dict.
+        self.children = {} if end is not None else None
+        # Edge label leading into this node is text[start:end]; leaves keep
+        # end=None and take the end of their document instead.
+        self.start = start
+        self.end = end
+        self.suffix_link = None
+        self.doc = doc
+        self.suffix_start = -1
+
+
+class GeneralizedSuffixTree:
+    """Compact generalized suffix tree over whole documents.
+
+    Built online with Ukkonen's algorithm: edges store ``(start, end)``
+    indices into ``text`` and internal nodes carry suffix links, so each
+    document is added in time linear in its length. ``text`` is a list of
+    characters, so appending a document never copies the earlier ones. Every document is
+    terminated by ``SEPARATOR``; the terminator at position ``p`` is keyed
+    by ``p`` itself, which makes it unique to its document.
+    """
+
     def __init__(self):
-        self.children = {}
-        self.is_end_of_suffix = False
-        # To track which words end here, but for simplicity, we'll store words directly
-        self.word_indices = set()
+        self.root = SuffixTreeNode(0, 0)
+        self.text = []
+        self.doc_starts = []
+        self._doc_ends = []
+
+    def __len__(self) -> int:
+        return len(self.doc_starts)
+
+    def _symbol(self, pos: int):
+        char = self.text[pos]
+        return pos if char == SEPARATOR else char
+
+    def _edge_end(self, node: SuffixTreeNode) -> int:
+        return node.end if node.end is not None else self._doc_ends[node.doc]
+
+    def _substring(self, start: int, end: int) -> str:
+        return ''.join(self.text[start:end])
+
+    def insert(self, document: str) -> int:
+        """Add ``document`` and return its id."""
+        if SEPARATOR in document:
+            raise ValueError("document must not contain the separator character")
+        doc = len(self.doc_starts)
+        offset = len(self.text)
+        self.text.extend(document)
+        self.text.append(SEPARATOR)
+        self.doc_starts.append(offset)
+        self._doc_ends.append(offset)
+
+        root = self.root
+        active_node = root
+        active_edge = 0
+        active_length = 0
+        remainder = 0
+        for i in range(offset, len(self.text)):
+            self._doc_ends[doc] = i + 1
+            symbol = self._symbol(i)
+            remainder += 1
+            last_internal = None
+            while remainder > 0:
+                if active_length == 0:
+                    active_edge = i
+                edge_symbol = self._symbol(active_edge)
+                child = active_node.children.get(edge_symbol)
+                if child is None:
+                    leaf = SuffixTreeNode(i, doc=doc)
+                    leaf.suffix_start = i - remainder + 1
+                    active_node.children[edge_symbol] = leaf
+                    if last_internal is not None:
+                        last_internal.suffix_link = active_node
+                        last_internal = None
+                else:
+                    edge_length = self._edge_end(child) - child.start
+                    if active_length >= edge_length:
+                        # Walk down: the active point lies beyond this edge.
+                        active_edge += edge_length
+                        active_length -= edge_length
+                        active_node = child
+                        continue
+                    if self._symbol(child.start + active_length) == symbol:
+                        # Already present implicitly; extend the active point.
+                        if last_internal is not None and active_node is not root:
+                            last_internal.suffix_link = active_node
+                            last_internal = None
+                        active_length += 1
+                        break
+                    split = SuffixTreeNode(child.start, child.start + active_length)
+                    active_node.children[edge_symbol] = split
+                    leaf = SuffixTreeNode(i, doc=doc)
+                    leaf.suffix_start = i - remainder + 1
+                    split.children[symbol] = leaf
+                    child.start += active_length
+                    split.children[self._symbol(child.start)] = child
+                    if last_internal is not None:
+                        last_internal.suffix_link = split
+                    last_internal = split
+                remainder -= 1
+                if active_node is root and active_length > 0:
+                    active_length -= 1
+                    active_edge = i - remainder + 1
+                elif active_node is not root:
+                    active_node = active_node.suffix_link or root
+        return doc
+
+    def bulk_insert(self, documents):
+        # The cyclic collector's repeated passes over the growing node set
+        # would dominate a large build, so it is paused meanwhile.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for document in documents:
+                self.insert(document)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _locate(self, pattern: str):
+        node = self.root
+        i = 0
+        while i < len(pattern):
+            child = node.children.get(pattern[i]) if node.children else None
+            if child is None:
+                return None
+            end = self._edge_end(child)
+            length = min(end - child.start, len(pattern) - i)
+            if self._substring(child.start, child.start + length) != pattern[i:i + length]:
+                return None
+            node = child
+            i += length
+        return node
+
+    def _leaves(self, node: SuffixTreeNode):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.end is None:
+                yield node
+            else:
+                stack.extend(node.children.values())
+
+    def find(self, pattern: str) -> list[tuple[int, int]]:
+        """Return ``(doc, position)`` for every occurrence of ``pattern``."""
+        if not pattern or SEPARATOR in pattern:
+            return []
+        node = self._locate(pattern)
+        if node is None:
+            return []
+        return sorted((leaf.doc, leaf.suffix_start - self.doc_starts[leaf.doc])
+                      for leaf in self._leaves(node))
+
+    def _annotate(self):
+        """Yield ``(node, string_depth, doc_mask)`` for internal nodes, children
+        before parents."""
+        order = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            order.append((node, depth))
+            for child in node.children.values():
+                if child.end is not None:
+                    stack.append((child, depth + child.end - child.start))
+        masks = {}
+        for node, depth in reversed(order):
+            mask = 0
+            for child in node.children.values():
+                if child.end is None:
+                    mask |= 1 << child.doc
+                else:
+                    mask |= masks.pop(id(child))
+            masks[id(node)] = mask
+            yield node, depth, mask
+
+    def longest_common_substring(self, doc_a: int, doc_b: int) -> str:
+        wanted = (1 << doc_a) | (1 << doc_b)
+        best_node, best_depth = None, 0
+        for node, depth, mask in self._annotate():
+            if depth > best_depth and mask & wanted == wanted:
+                best_node, best_depth = node, depth
+        if best_node is None:
+            return ''
+        return self._substring(best_node.end - best_depth, best_node.end)
+
+    def repeats(self, min_length: int = 3, min_docs: int = 2) -> list[tuple[str, list[int]]]:
+        """Return maximal repeated substrings shared by at least ``min_docs``
+        documents, longest first, with the ids of the documents sharing them."""
+        found = []
+        for node, depth, mask in self._annotate():
+            if node is self.root or depth < min_length:
+                continue
+            docs = [doc for doc in range(len(self.doc_starts)) if mask >> doc & 1]
+            if len(docs) >= min_docs:
+                found.append((self._substring(node.end - depth, node.end), docs))
+        found.sort(key=lambda item: (-len(item[0]), item[0]))
+        # Drop substrings of a longer repeat shared by the same documents.
+        maximal = []
+        for substring, docs in found:
+            if not any(docs == kept_docs and substring in kept
+                       for kept, kept_docs in maximal):
+                maximal.append((substring, docs))
+        return maximal
 
 
 class SuffixTree:
+    """Generalized suffix index over the vocabulary.
+
+    The words are concatenated into ``text`` (each one terminated by
+    ``SEPARATOR``) and indexed by a suffix array ``sa`` with its LCP array,
+    so substring queries are answered by binary search instead of walking a
+    per-character node forest. Suffixes are compared only up to the end of
+    their word.
+    """
+
     def __init__(self):
-        self.root = SuffixTreeNode()
         self.words = []  # Sorted list for binary search
+        self.text = ''
+        self.word_starts = array('i')
+        self.sa = array('i')
+        self.lcp = array('i')
+        self.word_bytes = 0  # Kept current so mem_usage is O(1)
+        self._index_dirty = False
 
     def insert(self, word: str):
-        if word in self.words:
+        index = bisect.bisect_left(self.words, word)
+        if index < len(self.words) and self.words[index] == word:
             return
-        bisect.insort(self.words, word)
-        # Build suffix tree for the word (for completeness, though not used for prefix search)
-        for i in range(len(word)):
-            suffix = word[i:]
-            node = self.root
-            for char in suffix:
-                if char not in node.children:
-                    node.children[char] = SuffixTreeNode()
-                node = node.children[char]
-            node.is_end_of_suffix = True
+        self.words.insert(index, word)
+        self.word_bytes += sys.getsizeof(word)
+        # The suffix array is rebuilt lazily on the next substring query.
+        self._index_dirty = True
 
     def search(self, prefix: str) -> list[str]:
-        if not hasattr(self, 'words') or not self.words:
+        # Words starting with prefix lie between it and its successor; an
+        # upper bound like prefix + '\uffff' would miss non-BMP characters.
+        start, end = prefix_range(self.words, prefix)
+        return self.words[start:end]
+
+    def search_many(self, prefixes) -> dict:
+        # A lookup is already just two bisects, so there is nothing for a
+        # sorted sweep to share; sorting the batch would only add its cost.
+        return {prefix: self.search(prefix) for prefix in dict.fromkeys(prefixes)}
+
+    def find_substring(self, pattern: str) -> list[tuple[str, int]]:
+        """Return ``(word, position)`` for every occurrence of ``pattern``."""
+        if not pattern or SEPARATOR in pattern:
             return []
-        # Use binary search to find words starting with prefix
-        start = bisect.bisect_left(self.words, prefix)
-        end = bisect.bisect_right(self.words, prefix + '\uffff')
-        return [w for w in self.words[start:end] if w.startswith(prefix)]
+        self.freeze()
+        text, sa, lcp = self.text, self.sa, self.lcp
+        m = len(pattern)
+
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(sa) or not text.startswith(pattern, sa[lo]):
+            return []
+
+        # Every following suffix sharing at least m characters also matches.
+        end = lo + 1
+        while end < len(sa) and lcp[end] >= m:
+            end += 1
+
+        matches = []
+        for rank in range(lo, end):
+            pos = sa[rank]
+            word_index = bisect.bisect_right(self.word_starts, pos) - 1
+            matches.append((self.words[word_index],
+                            pos - self.word_starts[word_index]))
+        matches.sort()
+        return matches
 
     def bulk_insert(self, words):
-        unique_words = sorted(set(words))
-        self.words = unique_words
-        for word in unique_words:
-            # Build suffix tree
-            for i in range(len(word)):
-                suffix = word[i:]
-                node = self.root
-                for char in suffix:
-                    if char not in node.children:
-                        node.children[char] = SuffixTreeNode()
-                    node = node.children[char]
-                node.is_end_of_suffix = True
+        self.words = sorted(set(self.words).union(words))
+        self.word_bytes = sum(map(sys.getsizeof, self.words))
+        self._build_index()
+
+    def _build_text(self):
+        self.text = SEPARATOR.join(self.words) + SEPARATOR
+        starts = array('i')
+        pos = 0
+        for word in self.words:
+            starts.append(pos)
+            pos += len(word) + 1
+        self.word_starts = starts
+
+    def _build_index(self):
+        self._build_text()
+        self.sa = self._build_suffix_array(self.text)
+        self.lcp = self._build_lcp(self.text, self.sa)
+        self._index_dirty = False
+
+    def freeze(self):
+        """Build the suffix array now if inserts left it stale, so that
+        later substring queries only read the structure."""
+        if self._index_dirty:
+            self._build_index()
+
+    def export_sections(self, words) -> dict:
+        self.freeze()
+        return {'sa': self.sa, 'lcp': self.lcp}
+
+    def import_sections(self, sections):
+        self.words = decode_words(sections)
+        self.word_bytes = sum(map(sys.getsizeof, self.words))
+        self._build_text()
+        self.sa = section_array(sections['sa'])
+        self.lcp = section_array(sections['lcp'])
+        self._index_dirty = False
+
+    @staticmethod
+    def _build_suffix_array(text: str) -> array:
+        # Prefix doubling: after the round for k, rank[i] orders the first
+        # 2k characters of suffix i (truncated at its separator). Each round
+        # is one O(n log n) sort and at most log2(longest word) rounds run.
+        n = len(text)
+        word_end = [0] * n
+        end = n
+        for i in range(n - 1, -1, -1):
+            if text[i] == SEPARATOR:
+                end = i
+            word_end[i] = end
+        sa = [i for i in range(n) if text[i] != SEPARATOR]
+        rank = [0] * n
+        for i in sa:
+            rank[i] = ord(text[i])
+        max_len = max((word_end[i] - i for i in sa), default=0)
+
+        k = 1
+        while True:
+            keys = {i: (rank[i], rank[i + k] if i + k < word_end[i] else 0)
+                    for i in sa}
+            sa.sort(key=keys.__getitem__)
+            current = 0
+            previous = None
+            for i in sa:
+                item = keys[i]
+                if item != previous:
+                    current += 1
+                    previous = item
+                rank[i] = current
+            if current == len(sa) or 2 * k >= max_len:
+                break
+            k *= 2
+
+        # Identical word-bounded suffixes are ordered by text position.
+        sa.sort(key=lambda i: (rank[i], i))
+        return array('i', sa)
+
+    @staticmethod
+    def _build_lcp(text: str, sa: array) -> array:
+        # Kasai et al.: lcp[r] is the common prefix length of the suffixes at
+        # ranks r - 1 and r, computed in O(n) by visiting suffixes in text
+        # order and reusing the previous length minus one.
+        rank = [-1] * len(text)
+        for r, pos in enumerate(sa):
+            rank[pos] = r
+        lcp = array('i', [0]) * len(sa)
+        h = 0
+        for i, ch in enumerate(text):
+            if ch == SEPARATOR:
+                h = 0
+                continue
+            r = rank[i]
+            if r > 0:
+                j = sa[r - 1]
+                while text[i + h] == text[j + h] and text[i + h] != SEPARATOR:
+                    h += 1
+                lcp[r] = h
+                if h > 0:
+                    h -= 1
+            else:
+                h = 0
+        return lcp
+
+    def node_count(self) -> int:
+        return len(self.sa)  # One entry per indexed suffix
 
     def mem_usage(self) -> float:
-        def count_nodes(node: SuffixTreeNode) -> int:
-            count = 1
-            for child in node.children.values():
-                count += count_nodes(child)
-            return count
-        node_count = count_nodes(self.root)
-        return (node_count * 120) / 1024  # Rough estimate in KB
+        # The text and index arrays plus the sorted word list and its strings.
+        size = (sys.getsizeof(self.text) +
+                sys.getsizeof(self.words) + self.word_bytes +
+                self.sa.itemsize * len(self.sa) +
+                self.lcp.itemsize * len(self.lcp) +
+                self.word_starts.itemsize * len(self.word_starts))
+        return size / 1024  # Convert to KB
 
     def complexity(self) -> dict:
         return {
-            'time': 'O(n)',  # Linear search for prefix
-            'space': 'O(n^2)'  # Worst case for suffix tree
+            'time': 'O(m log n)',  # Binary search over the suffix array
+            'space': 'O(n)'  # n = total characters in the vocabulary
         }
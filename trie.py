@@ -1,53 +1,371 @@
+import bisect
+import heapq
+from array import array
+from collections import Counter
+
+from index_store import decode_words
+from prefix_search import prefix_range
+
+# Average deep size of a node (slotted object, children dict if any and its
+# share of the top-k lists) measured with utils.deep_sizeof on the sample
+# corpus under CPython 3.11, 64-bit.
+NODE_BYTES = 286
+
+
 class TrieNode:
+    __slots__ = ('children', 'is_end_of_word', 'frequency', 'top')
+
     def __init__(self):
-        self.children = {}
+        self.children = None  # Created with the first child; leaves stay None
         self.is_end_of_word = False
+        self.frequency = 0
+        # Best completions below this node as (-frequency, word), kept sorted
+        self.top = []
 
 
 class Trie:
-    def __init__(self):
+    def __init__(self, top_k: int = 10):
         self.root = TrieNode()
         self.word_count = 0
+        self.nodes = 1  # Maintained on insert so mem_usage never walks the trie
+        self.top_k = top_k
 
-    def insert(self, word: str):
-        node = self.root
+    def _clone(self, node: TrieNode) -> TrieNode:
+        clone = TrieNode()
+        clone.children = dict(node.children) if node.children else None
+        clone.is_end_of_word = node.is_end_of_word
+        clone.frequency = node.frequency
+        clone.top = list(node.top)
+        return clone
+
+    def _add(self, word: str, count: int, copy: bool):
+        """Add ``word`` below a root and return ``(root, new_nodes, is_new)``.
+        With ``copy``, every node on the path is cloned first and the clones
+        are modified, so the current root still describes the old trie."""
+        root = self._clone(self.root) if copy else self.root
+        node = root
+        path = [node]
+        new_nodes = 0
         for char in word:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        if not node.is_end_of_word:
-            node.is_end_of_word = True
-            self.word_count += 1
+            children = node.children
+            if children is None:
+                children = node.children = {}
+            child = children.get(char)
+            if child is None:
+                child = children[char] = TrieNode()
+                new_nodes += 1
+            elif copy:
+                child = children[char] = self._clone(child)
+            node = child
+            path.append(node)
+        is_new = not node.is_end_of_word
+        node.is_end_of_word = True
+        old_entry = (-node.frequency, word)
+        node.frequency += count
+        new_entry = (-node.frequency, word)
+        # Frequencies only grow, so a word evicted from a cache can never
+        # need to come back: updating the nodes on the path is enough.
+        for path_node in path:
+            self._update_top(path_node, old_entry, new_entry)
+        return root, new_nodes, is_new
+
+    def insert(self, word: str, count: int = 1):
+        _, new_nodes, is_new = self._add(word, count, copy=False)
+        self.nodes += new_nodes
+        self.word_count += is_new
+
+    def inserted(self, word: str, count: int = 1) -> 'Trie':
+        """Return a new trie with ``word`` added (path copying); this one is
+        left unchanged and shares every node off the word's path."""
+        root, new_nodes, is_new = self._add(word, count, copy=True)
+        trie = Trie(self.top_k)
+        trie.root = root
+        trie.nodes = self.nodes + new_nodes
+        trie.word_count = self.word_count + is_new
+        return trie
+
+    def _update_top(self, node: TrieNode, old_entry: tuple, new_entry: tuple):
+        # A list may be shared with a single child (see _fill_top), so a
+        # changed list is replaced rather than modified in place.
+        top = node.top
+        if old_entry in top:
+            top = [entry for entry in top if entry != old_entry]
+        elif len(top) >= self.top_k and new_entry >= top[-1]:
+            return
+        else:
+            top = list(top)
+        bisect.insort(top, new_entry)
+        node.top = top[:self.top_k]
+
+    def _fill_top(self):
+        """Recompute every node's top-k list in one bottom-up pass: the k
+        best of the node's own entry and its children's lists. A node with
+        a single child and no word of its own shares that child's list."""
+        k = self.top_k
+        nodes, prefixes = [], []
+        stack = [(self.root, '')]
+        while stack:
+            node, prefix = stack.pop()
+            nodes.append(node)
+            prefixes.append(prefix)
+            if node.children:
+                for char, child in node.children.items():
+                    stack.append((child, prefix + char))
+        # Children come after their parent, so walk the list backwards.
+        for i in range(len(nodes) - 1, -1, -1):
+            node = nodes[i]
+            children = node.children
+            if node.is_end_of_word:
+                top = [(-node.frequency, prefixes[i])]
+            elif children and len(children) == 1:
+                for child in children.values():
+                    node.top = child.top
+                continue
+            else:
+                top = []
+            if children:
+                for child in children.values():
+                    top += child.top
+                top.sort()
+                del top[k:]
+            node.top = top
 
-    def search(self, prefix: str) -> list[str]:
+    def _find_node(self, prefix: str) -> TrieNode:
         node = self.root
         for char in prefix:
-            if char not in node.children:
-                return []
+            if not node.children or char not in node.children:
+                return None
             node = node.children[char]
+        return node
+
+    def search(self, prefix: str, k: int = None) -> list[str]:
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        if k is not None:
+            return self._top_words(node, prefix, k)
         suggestions = []
         self._collect_words(node, prefix, suggestions)
         return sorted(list(set(suggestions)))
 
+    def search_many(self, prefixes, k: int = None) -> dict:
+        """Answer many prefixes at once, in sorted order, reusing the
+        descent path shared with the previous prefix. A prefix extending an
+        earlier one is answered by slicing that one's sorted completions
+        instead of traversing the subtree again."""
+        results = {}
+        previous = ''
+        path = [self.root]  # path[i] is the node reached by previous[:i]
+        collected = []  # (prefix, sorted completions) of enclosing prefixes
+        for prefix in sorted(set(prefixes)):
+            while collected and not prefix.startswith(collected[-1][0]):
+                collected.pop()
+            if k is None and collected:
+                words = collected[-1][1]
+                start, end = prefix_range(words, prefix)
+                results[prefix] = words[start:end]
+                continue
+
+            common = 0
+            limit = min(len(previous), len(prefix), len(path) - 1)
+            while common < limit and previous[common] == prefix[common]:
+                common += 1
+            del path[common + 1:]
+            node = path[-1]
+            for char in prefix[common:]:
+                node = node.children.get(char) if node.children else None
+                if node is None:
+                    break
+                path.append(node)
+            previous = prefix
+            if node is None:
+                results[prefix] = []
+            elif k is not None:
+                results[prefix] = self._top_words(node, prefix, k)
+            else:
+                suggestions = []
+                self._collect_words(node, prefix, suggestions)
+                suggestions.sort()
+                results[prefix] = suggestions
+                collected.append((prefix, suggestions))
+        return results
+
+    def fuzzy_search(self, query: str, max_edits: int = 1, k: int = 10) -> list[str]:
+        """Words within ``max_edits`` insertions, deletions or substitutions
+        of ``query``, closest first and then most frequent.
+
+        One Levenshtein row against ``query`` is computed per trie node, so
+        the rows for a shared prefix are computed once, and a subtree is
+        skipped as soon as every cell of its row exceeds ``max_edits``.
+        """
+        columns = len(query) + 1
+        limit = max_edits + 1  # any cell value above max_edits is clamped here
+        matches = []
+        stack = [(self.root, '', [min(col, limit) for col in range(columns)])]
+        while stack:
+            node, word, row = stack.pop()
+            if node.is_end_of_word and row[-1] <= max_edits:
+                matches.append((row[-1], -node.frequency, word))
+            # Only cells within ``max_edits`` of the diagonal can stay in
+            # bounds, so each row is filled on that band alone.
+            depth = len(word) + 1
+            low = max(1, depth - max_edits)
+            high = min(columns - 1, depth + max_edits)
+            if not node.children:
+                continue
+            for char, child in node.children.items():
+                next_row = [limit] * columns
+                if depth <= max_edits:
+                    next_row[0] = depth
+                left = best = next_row[low - 1]
+                for col in range(low, high + 1):
+                    left = min(left + 1, row[col] + 1,
+                               row[col - 1] + (query[col - 1] != char), limit)
+                    next_row[col] = left
+                    if left < best:
+                        best = left
+                # A subtree whose row is all out of bounds holds no match.
+                if best <= max_edits:
+                    stack.append((child, word + char, next_row))
+        if k is None:
+            return [word for _, _, word in sorted(matches)]
+        return [word for _, _, word in heapq.nsmallest(k, matches)]
+
+    def _top_words(self, node: TrieNode, prefix: str, k: int) -> list[str]:
+        if k <= self.top_k:
+            return [word for _, word in node.top[:k]]
+        # Larger requests than the cache holds fall back to a full scan.
+        entries = []
+        self._collect_entries(node, prefix, entries)
+        return [word for _, word in heapq.nsmallest(k, entries)]
+
+    # The collectors use an explicit stack instead of recursion: no call
+    # overhead per node and no RecursionError on very long words.
+    def _collect_entries(self, node: TrieNode, current_prefix: str, entries: list):
+        stack = [(node, current_prefix)]
+        while stack:
+            node, current_prefix = stack.pop()
+            if node.is_end_of_word:
+                entries.append((-node.frequency, current_prefix))
+            if node.children:
+                for char, child in node.children.items():
+                    stack.append((child, current_prefix + char))
+
     def _collect_words(self, node: TrieNode, current_prefix: str, suggestions: list):
-        if node.is_end_of_word:
-            suggestions.append(current_prefix)
+        stack = [(node, current_prefix)]
+        while stack:
+            node, current_prefix = stack.pop()
+            if node.is_end_of_word:
+                suggestions.append(current_prefix)
+            if node.children:
+                for char, child in node.children.items():
+                    stack.append((child, current_prefix + char))
 
-        for char, child in node.children.items():
-            self._collect_words(child, current_prefix + char, suggestions)
+    def frequency(self, word: str) -> int:
+        node = self._find_node(word)
+        return node.frequency if node is not None else 0
 
     def bulk_insert(self, words):
-        for word in words:
-            self.insert(word)
+        # ``words`` is consumed once; a Counter is taken as frequencies. All
+        # counts go in first and the top-k lists are filled once at the end.
+        counts = Counter(words)
+        if not counts:
+            return
+        for word, count in counts.items():
+            node = self.root
+            for char in word:
+                children = node.children
+                if children is None:
+                    children = node.children = {}
+                child = children.get(char)
+                if child is None:
+                    child = children[char] = TrieNode()
+                    self.nodes += 1
+                node = child
+            if not node.is_end_of_word:
+                node.is_end_of_word = True
+                self.word_count += 1
+            node.frequency += count
+        self._fill_top()
+
+    def export_sections(self, words) -> dict:
+        """Flat node arrays in breadth-first order: the children of node
+        ``i`` are nodes ``child_offsets[i]`` to ``child_offsets[i + 1] - 1``,
+        ``chars[i]`` is the code point leading into node ``i`` and
+        ``node_words[i]`` the index of the word ending there (or -1). Top-k
+        lists are stored as word indices, except for nodes with one child
+        and no word of their own, whose list is that child's."""
+        index = {word: i for i, word in enumerate(words)}
+        frequency = array('Q', [0]) * len(words)
+        chars = array('I', [0])
+        child_offsets = array('i')
+        node_words = array('i')
+        top_offsets = array('i', [0])
+        top_words = array('i')
+        queue = [(self.root, '')]
+        head = 0
+        while head < len(queue):
+            node, prefix = queue[head]
+            head += 1
+            child_offsets.append(len(queue))
+            if node.children:
+                for char, child in node.children.items():
+                    chars.append(ord(char))
+                    queue.append((child, prefix + char))
+            if node.is_end_of_word:
+                node_words.append(index[prefix])
+                frequency[index[prefix]] = node.frequency
+            else:
+                node_words.append(-1)
+            if node.is_end_of_word or len(node.children or ()) != 1:
+                top_words.extend(index[word] for _, word in node.top)
+            top_offsets.append(len(top_words))
+        child_offsets.append(len(queue))
+        return {
+            'frequency': frequency,
+            'chars': chars,
+            'child_offsets': child_offsets,
+            'node_words': node_words,
+            'top_offsets': top_offsets,
+            'top_words': top_words,
+        }
+
+    def import_sections(self, sections):
+        # Nodes are rebuilt straight from the arrays, without inserting any
+        # word or re-merging any top-k list.
+        words = decode_words(sections)
+        frequency = sections['frequency'].tolist()
+        entries = [(-count, word) for count, word in zip(frequency, words)]
+        letters = list(map(chr, sections['chars'].tolist()))
+        child_offsets = sections['child_offsets'].tolist()
+        node_words = sections['node_words'].tolist()
+        top_offsets = sections['top_offsets'].tolist()
+        top_words = sections['top_words'].tolist()
+        nodes = [TrieNode() for _ in node_words]
+        for node, start, end in zip(nodes, child_offsets, child_offsets[1:]):
+            if start < end:
+                node.children = dict(zip(letters[start:end], nodes[start:end]))
+        # Children come after their parent, so going backwards a node that
+        # shares its only child's list finds that list already filled.
+        for i in range(len(nodes) - 1, -1, -1):
+            node = nodes[i]
+            word = node_words[i]
+            if word >= 0:
+                node.is_end_of_word = True
+                node.frequency = frequency[word]
+            elif child_offsets[i + 1] - child_offsets[i] == 1:
+                node.top = nodes[child_offsets[i]].top
+                continue
+            node.top = [entries[j] for j in top_words[top_offsets[i]:top_offsets[i + 1]]]
+        self.root = nodes[0]
+        self.nodes = len(nodes)
+        self.word_count = len(words)
+
+    def node_count(self) -> int:
+        return self.nodes
 
     def mem_usage(self) -> float:
-        def count_nodes(node: TrieNode) -> int:
-            count = 1
-            for child in node.children.values():
-                count += count_nodes(child)
-            return count
-        node_count = count_nodes(self.root)
-        return (node_count * 100) / 1024  # Convert to KB
+        return (self.nodes * NODE_BYTES) / 1024  # Convert to KB
 
     def complexity(self) -> dict:
         return {
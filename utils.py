@@ -1,7 +1,31 @@
 import csv
+import gc
+import hashlib
+import json
+import mmap
 import os
 import pickle
+import platform
+import random
+import re
+import sys
+import threading
 import time
+import tracemalloc
+import types
+from collections import Counter, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+
+from index_store import open_index, read_index, read_manifest, write_index
+from result_cache import CachedStructure
+from sharded_index import ShardedIndex
+from snapshot import VersionedIndex
+
+DEFAULT_CORPUS = ['apple', 'application', 'apply', 'aptitude']
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
 
 
 def load_corpus(filename='sample_corpus.txt'):
@@ -13,36 +37,184 @@ def load_corpus(filename='sample_corpus.txt'):
                 if word:
                     corpus.append(word)
     except FileNotFoundError:
-        corpus = ['apple', 'application', 'apply', 'aptitude']
+        corpus = list(DEFAULT_CORPUS)
     return corpus
 
 
-def save_structure(ds, filename: str):
-    with open(filename, 'wb') as f:
-        pickle.dump(ds, f)
+def _iter_lines(filename):
+    # Memory-mapped and decoded a line at a time.
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode('utf-8', errors='replace')
+
+
+def iter_corpus(filename='sample_corpus.txt', tokenize=False):
+    """Stream the corpus without reading it into memory.
+
+    The file is memory-mapped and consumed a line at a time. By default each
+    non-empty stripped line is one word, as in load_corpus; with
+    ``tokenize=True`` lines are treated as free text and split into
+    lowercased word tokens.
+    """
+    if not os.path.exists(filename):
+        yield from DEFAULT_CORPUS
+        return
+    for text in _iter_lines(filename):
+        if tokenize:
+            for match in TOKEN_PATTERN.finditer(text):
+                yield match.group().lower()
+        else:
+            word = text.strip()
+            if word:
+                yield word
+
+
+def iter_token_lines(filename):
+    """Stream a free-text file as one list of lowercased tokens per
+    non-empty line, so n-grams do not run across line breaks."""
+    for text in _iter_lines(filename):
+        tokens = [match.group().lower() for match in TOKEN_PATTERN.finditer(text)]
+        if tokens:
+            yield tokens
+
+
+def corpus_frequencies(filename='sample_corpus.txt', tokenize=False) -> Counter:
+    # Counted while streaming, so memory is bounded by the vocabulary rather
+    # than the corpus. Every bulk_insert accepts the result: frequency-aware
+    # structures take the counts, the others only its distinct words.
+    return Counter(iter_corpus(filename, tokenize))
+
+
+def corpus_hash(filename='sample_corpus.txt', tokenize=False) -> str:
+    digest = hashlib.sha256()
+    if tokenize:
+        # A tokenized build of the same file indexes different words.
+        digest.update(b'tokenize\x00')
+    try:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        digest.update('\n'.join(DEFAULT_CORPUS).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def save_structure(ds, filename: str, corpus_digest: str = None):
+    write_index(ds, filename, corpus_digest)
+
+
+def structure_pickle_size(ds) -> float:
+    return len(pickle.dumps(ds)) / 1024  # Convert to KB
 
 
 def load_structure(cls, filename: str):
     if os.path.exists(filename):
-        with open(filename, 'rb') as f:
-            return pickle.load(f)
+        return read_index(cls, filename)
     else:
         return None
 
 
-def initialize_structure(structures, corpus_file='sample_corpus.txt'):
-    corpus = load_corpus(corpus_file)
-    for name, ds in structures.items():
-        filename = f"{name.lower()}_structure.pkl"
-
-        loaded_ds = load_structure(type(ds), filename)
-        if loaded_ds is not None:
-            structures[name] = loaded_ds
-            continue
-        ds.bulk_insert(corpus)
-        save_structure(ds, filename)
-
-    return structures
+def is_cache_current(cls, filename: str, corpus_digest: str) -> bool:
+    # A cache is reusable only if it holds this structure, was written in the
+    # current format version and from the same corpus contents.
+    try:
+        manifest = read_manifest(filename)
+    except (OSError, ValueError, KeyError):
+        return False
+    return (manifest.get('structure') == cls.__name__ and
+            manifest.get('corpus_hash') == corpus_digest)
+
+
+class LazyStructures(MutableMapping):
+    """Mapping of structure name to structure that loads (or rebuilds and
+    caches) each structure on first access only.
+
+    With ``mapped=True`` each name is served by a read-only MappedIndex over
+    its (current, rebuilt if need be) index file instead, so no nodes are
+    built at all.
+    """
+
+    def __init__(self, structures, corpus_file='sample_corpus.txt', tokenize=False,
+                 wrapper=None, mapped=False):
+        self._names = list(structures)
+        self.wrapper = wrapper
+        self.mapped = mapped
+        self._pending = dict(structures)
+        self._loaded = {}
+        self.corpus_file = corpus_file
+        self.tokenize = tokenize
+        self._frequencies = None
+        self._corpus_digest = None
+
+    def _load(self, name):
+        ds = self._pending.pop(name)
+        if self._corpus_digest is None:
+            self._corpus_digest = corpus_hash(self.corpus_file, self.tokenize)
+        # One file per corpus (and tokenization): switching corpora never
+        # rewrites a file built from another, which a server may have mapped.
+        filename = f"{name.lower()}_{self._corpus_digest[:12]}_structure.idx"
+
+        if is_cache_current(type(ds), filename, self._corpus_digest):
+            try:
+                if self.mapped:
+                    ds = open_index(filename)
+                else:
+                    ds = load_structure(type(ds), filename)
+            except (OSError, ValueError, KeyError):
+                ds = type(ds)()
+            else:
+                return self._publish(name, ds)
+
+        if self._frequencies is None:
+            self._frequencies = corpus_frequencies(self.corpus_file, self.tokenize)
+        ds.bulk_insert(self._frequencies)
+        save_structure(ds, filename, self._corpus_digest)
+        if self.mapped:
+            ds = open_index(filename)
+        return self._publish(name, ds)
+
+    def _publish(self, name, ds):
+        # The cache file always holds the bare structure; wrapping (e.g. a
+        # result cache) happens on the way out.
+        if self.wrapper is not None:
+            ds = self.wrapper(ds)
+        self._loaded[name] = ds
+        return ds
+
+    def is_loaded(self, name) -> bool:
+        return name in self._loaded
+
+    def __getitem__(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        if name in self._pending:
+            return self._load(name)
+        raise KeyError(name)
+
+    def __setitem__(self, name, ds):
+        if name not in self._names:
+            self._names.append(name)
+        self._pending.pop(name, None)
+        self._loaded[name] = ds
+
+    def __delitem__(self, name):
+        self._names.remove(name)
+        self._pending.pop(name, None)
+        self._loaded.pop(name, None)
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+
+def initialize_structure(structures, corpus_file='sample_corpus.txt', tokenize=False,
+                         wrapper=None, mapped=False):
+    return LazyStructures(structures, corpus_file, tokenize, wrapper, mapped)
 
 
 def calculate_accuracy(suggestions, prefix, corpus):
@@ -56,23 +228,54 @@ def calculate_accuracy(suggestions, prefix, corpus):
     return accuracy, correct, len(ground_truth)
 
 
-def save_results_to_csv(results, filename='benchmark_results.csv'):
-    headers = ['Data Structure', 'Avg Time (ms)', 'Avg Accuracy (%)', 'Avg Memory (KB)',
-               'Avg Suggestions', 'Build Time (ms)', 'Search Time (ms)', 'Time Complexity', 'Space Complexity']
+def run_parameters(corpus_file, tokenize, corpus_size, warmup, iterations) -> dict:
+    return {
+        'corpus': corpus_file,
+        'tokenize': tokenize,
+        'corpus_size': corpus_size,
+        'warmup': warmup,
+        'iterations': iterations,
+        'timer': 'perf_counter_ns',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def save_results(results, params, filename='benchmark_results.csv'):
+    """Write a benchmark summary with the run's parameters.
+
+    ``.json`` files get ``{"params": ..., "results": ...}``; anything else
+    is written as CSV with one row per structure and the parameters
+    repeated as trailing columns, so runs can be concatenated.
+    """
+    if filename.endswith('.json'):
+        with open(filename, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2)
+        return
+
+    headers = ['Data Structure', 'Search p50 (ms)', 'Search p95 (ms)', 'Search p99 (ms)',
+               'Search Mean (ms)', 'Avg Accuracy (%)', 'Memory (KB)', 'Avg Suggestions',
+               'Build p50 (ms)', 'Build p95 (ms)', 'Pickle Size (KB)',
+               'Time Complexity', 'Space Complexity'] + list(params)
 
     rows = []
     for ds_name, metrics in results.items():
         row = [
             ds_name,
-            f"{metrics['avg_time']:.3f}",
+            f"{metrics['search_time']:.4f}",
+            f"{metrics['search_p95']:.4f}",
+            f"{metrics['search_p99']:.4f}",
+            f"{metrics['avg_time']:.4f}",
             f"{metrics['avg_accuracy']:.1f}",
             f"{metrics['avg_memory']:.1f}",
             f"{metrics['avg_suggestions']:.1f}",
-            f"{metrics.get('build_time', 0):.3f}",
-            f"{metrics.get('search_time', 0):.3f}",
+            f"{metrics['build_time']:.3f}",
+            f"{metrics['build_p95']:.3f}",
+            f"{metrics.get('pickle_size', 0):.1f}",
             metrics.get('time_complexity', 'N/A'),
             metrics.get('space_complexity', 'N/A')
-        ]
+        ] + list(params.values())
         rows.append(row)
 
     # Write to CSV
@@ -150,8 +353,91 @@ def get_prefixes_for_testing(corpus, count=6):
     return valid_prefixes[:count]
 
 
+def structure_class(ds):
+    # Result caches wrap a structure; fresh builds use the inner class.
+    while isinstance(ds, CachedStructure):
+        ds = ds.ds
+    return type(ds)
+
+
+def deep_sizeof(obj) -> int:
+    """Bytes reachable from ``obj``: containers, instance ``__dict__`` and
+    ``__slots__`` are followed, every object is counted once, and classes,
+    functions and modules are skipped."""
+    skip = (type, types.FunctionType, types.BuiltinFunctionType, types.ModuleType)
+    seen = set()
+    # ``obj`` stays referenced for the whole walk: if a temporary were freed
+    # part-way, its ids could be reused and wrongly taken as seen.
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, skip):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        if hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+        for cls in type(item).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+def synthetic_corpus(words, factor=10, seed=0) -> list[str]:
+    """Roughly ``factor`` times as many distinct words as ``words``, made by
+    joining the head of one corpus word to the tail of another, so the
+    result keeps the corpus's character and prefix statistics."""
+    rng = random.Random(seed)
+    words = [word for word in dict.fromkeys(words) if len(word) > 1]
+    result = dict.fromkeys(words)
+    target = len(words) * factor
+    while len(result) < target:
+        head, tail = rng.choice(words), rng.choice(words)
+        word = head[:rng.randint(1, len(head) - 1)] + tail[rng.randint(1, len(tail) - 1):]
+        result[word] = None
+    return list(result)
+
+
+def measure_memory(structures, corpus) -> dict:
+    """Measured memory of each structure built fresh from ``corpus``.
+
+    ``traced_kb`` is what tracemalloc sees allocated by the build and still
+    live afterwards; ``deep_kb`` is a deep sizeof of the built structure
+    (which also counts word strings shared with the corpus). Both are put
+    next to the O(1) ``mem_usage`` estimate.
+    """
+    results = {}
+    for name, ds in structures.items():
+        cls = structure_class(ds)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fresh = cls()
+        fresh.bulk_insert(corpus)
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        deep = deep_sizeof(fresh)
+        nodes = fresh.node_count()
+        results[name] = {
+            'estimate_kb': fresh.mem_usage(),
+            'traced_kb': traced / 1024,
+            'deep_kb': deep / 1024,
+            'nodes': nodes,
+            'bytes_per_node': deep / nodes if nodes else 0.0,
+        }
+    return results
+
+
 def validate_implementations(structures):
-    required_methods = ['insert', 'search',
+    required_methods = ['insert', 'search', 'search_many',
                         'bulk_insert', 'mem_usage', 'complexity']
     all_valid = True
     for name, ds in structures.items():
@@ -162,41 +448,260 @@ def validate_implementations(structures):
     return all_valid
 
 
-def benchmark_build_time(structures, corpus):
+def percentile(sorted_samples, q: float):
+    # Nearest-rank percentile of an already sorted, non-empty list.
+    rank = max(1, -(-len(sorted_samples) * q // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def latency_summary(samples_ns) -> dict:
+    """Summarise ``perf_counter_ns`` samples in milliseconds."""
+    samples = sorted(samples_ns)
+    to_ms = 1e-6
+    return {
+        'iterations': len(samples),
+        'min': samples[0] * to_ms,
+        'p50': percentile(samples, 50) * to_ms,
+        'p95': percentile(samples, 95) * to_ms,
+        'p99': percentile(samples, 99) * to_ms,
+        'max': samples[-1] * to_ms,
+        'mean': sum(samples) / len(samples) * to_ms,
+    }
+
+
+def measure(function, setup=None, warmup=3, iterations=30) -> list[int]:
+    """Time ``function`` ``iterations`` times after ``warmup`` untimed
+    calls and return the samples in nanoseconds. ``setup()``, if given,
+    runs untimed before every call and its result is passed as the
+    arguments."""
+    samples = []
+    for i in range(warmup + iterations):
+        args = setup() if setup is not None else ()
+        start_time = time.perf_counter_ns()
+        function(*args)
+        elapsed = time.perf_counter_ns() - start_time
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def benchmark_build_time(structures, corpus, workers=None, warmup=1, iterations=5):
+    # Every build goes into a fresh instance; the loaded structures are
+    # left untouched.
     build_times = {}
     for name, ds in structures.items():
-        start_time = time.time()
-        ds.bulk_insert(corpus)
-        end_time = time.time()
-        build_times[name] = (end_time - start_time) * 1000  # in ms
-    return build_times
-
-
-def benchmark_search_time(structures, prefixes, runs=3):
-    search_times = {name: [] for name in structures.keys()}
-    for prefix in prefixes:
+        cls = structure_class(ds)
+        samples = measure(lambda fresh: fresh.bulk_insert(corpus),
+                          setup=lambda: (cls(),), warmup=warmup, iterations=iterations)
+        build_times[name] = latency_summary(samples)
+    if workers is None:
+        return build_times
+
+    # Scaling of a sharded build (one shard per worker) in fresh instances.
+    scaling = {}
+    for name, ds in structures.items():
+        scaling[name] = {}
+        for count in workers:
+            samples = measure(
+                lambda sharded: sharded.bulk_insert(corpus),
+                setup=lambda: (ShardedIndex(structure_class(ds), num_shards=count,
+                                            workers=count),),
+                warmup=0, iterations=iterations)
+            scaling[name][count] = latency_summary(samples)['p50']
+    return {name: {'build_time': build_times[name]['p50'], 'scaling': scaling[name]}
+            for name in build_times}
+
+
+def benchmark_search_time(structures, prefixes, warmup=3, iterations=30):
+    # Each query is timed on its own; samples are pooled over all prefixes.
+    search_times = {}
+    for name, ds in structures.items():
+        samples = []
+        for prefix in prefixes:
+            samples.extend(measure(ds.search, setup=lambda: (prefix,),
+                                   warmup=warmup, iterations=iterations))
+        search_times[name] = latency_summary(samples)
+    return search_times
+
+
+def benchmark_batch_search(structures, prefixes, runs=3):
+    # Whole batch answered one prefix at a time versus one search_many call.
+    # Both sides keep every result, as search_many has to.
+    results = {}
+    for name, ds in structures.items():
+        single_times, batch_times = [], []
         for run in range(runs):
-            for name, ds in structures.items():
-                start_time = time.time()
-                ds.search(prefix)
-                end_time = time.time()
-                search_times[name].append(
-                    (end_time - start_time) * 1000)  # in ms
-    avg_search_times = {name: sum(times) / len(times)
-                        for name, times in search_times.items()}
-    return avg_search_times
-
-
-def simulate_scalability(structures, corpus_sizes):
+            start_time = time.perf_counter()
+            answers = {prefix: ds.search(prefix) for prefix in prefixes}
+            single_times.append((time.perf_counter() - start_time) * 1000)
+            del answers
+            start_time = time.perf_counter()
+            ds.search_many(prefixes)
+            batch_times.append((time.perf_counter() - start_time) * 1000)
+        results[name] = {'single_ms': min(single_times), 'batch_ms': min(batch_times)}
+    return results
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        row = [i]
+        for j, char_b in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1,
+                           previous[j - 1] + (char_a != char_b)))
+        previous = row
+    return previous[-1]
+
+
+def fuzzy_scan(ds, query, max_edits=1, k=10):
+    # Reference for structures without fuzzy_search: edit distance against
+    # every stored word, ranked like Trie.fuzzy_search.
+    frequency = getattr(ds, 'frequency', lambda word: 0)
+    matches = []
+    for word in ds.search(''):
+        if abs(len(word) - len(query)) <= max_edits:
+            distance = edit_distance(query, word)
+            if distance <= max_edits:
+                matches.append((distance, -frequency(word), word))
+    return [word for _, _, word in sorted(matches)[:k]]
+
+
+def make_typos(words, count=100, max_edits=1, seed=0):
+    """Return ``(typo, intended)`` pairs, each typo ``max_edits`` random
+    deletions, insertions or substitutions away from a corpus word."""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = [word for word in words if len(word) > max_edits + 2]
+    pairs = []
+    for intended in rng.sample(words, min(count, len(words))):
+        typo = intended
+        for _ in range(max_edits):
+            i = rng.randrange(len(typo))
+            edit = rng.randrange(3)
+            if edit == 0:
+                typo = typo[:i] + typo[i + 1:]
+            elif edit == 1:
+                typo = typo[:i] + rng.choice(letters) + typo[i:]
+            else:
+                typo = typo[:i] + rng.choice(letters) + typo[i + 1:]
+        pairs.append((typo, intended))
+    return pairs
+
+
+def benchmark_fuzzy_search(structures, words, count=100, max_edits=1, k=10):
+    # Latency of typo-tolerant lookups next to an exact prefix lookup of the
+    # same query, and recall@k of the word the typo was made from.
+    pairs = make_typos(sorted(set(words)), count, max_edits)
+    results = {}
+    for name, ds in structures.items():
+        if hasattr(ds, 'fuzzy_search'):
+            search = ds.fuzzy_search
+        else:
+            search = lambda query, edits, limit, ds=ds: fuzzy_scan(ds, query, edits, limit)
+        found = 0
+        start_time = time.perf_counter()
+        for typo, intended in pairs:
+            if intended in search(typo, max_edits, k):
+                found += 1
+        fuzzy_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for typo, _ in pairs:
+            ds.search(typo)
+        exact_time = time.perf_counter() - start_time
+        results[name] = {
+            'fuzzy_ms': fuzzy_time * 1000 / len(pairs),
+            'exact_ms': exact_time * 1000 / len(pairs),
+            'recall': found / len(pairs),
+            'native': hasattr(ds, 'fuzzy_search'),
+        }
+    return results
+
+
+def benchmark_concurrent_ingest(structures, words, new_words, readers=4, prefixes=None):
+    """Insert ``new_words`` one at a time into a VersionedIndex over each
+    structure while ``readers`` threads keep querying it. Reports write and
+    read throughput and any reader that saw an inconsistent result."""
+    if prefixes is None:
+        prefixes = sorted({word[:2] for word in words if len(word) >= 2})
+    results = {}
+    for name, ds in structures.items():
+        fresh = structure_class(ds)()
+        fresh.bulk_insert(words)
+        index = VersionedIndex(fresh)
+        stop = threading.Event()
+        reads = [0] * readers
+        errors = []
+
+        def reader(slot):
+            rng = random.Random(slot)
+            while not stop.is_set():
+                prefix = rng.choice(prefixes)
+                try:
+                    found = index.search(prefix)
+                    if found != sorted(found) or not all(w.startswith(prefix) for w in found):
+                        errors.append(f"inconsistent result for {prefix!r}")
+                except Exception as e:
+                    errors.append(repr(e))
+                reads[slot] += 1
+
+        with ThreadPoolExecutor(max_workers=readers) as pool:
+            for slot in range(readers):
+                pool.submit(reader, slot)
+            start_time = time.perf_counter()
+            for word in new_words:
+                index.insert(word)
+            elapsed = time.perf_counter() - start_time
+            stop.set()
+        missing = [word for word in new_words if word not in index.search(word)]
+        results[name] = {
+            'inserts_per_s': len(new_words) / elapsed if elapsed else 0.0,
+            'reads_per_s': sum(reads) / elapsed if elapsed else 0.0,
+            'versions': index.version,
+            'errors': len(errors) + len(missing),
+            'mode': 'path copy' if index.path_copying else 'delta merge',
+        }
+    return results
+
+
+def benchmark_insert_throughput(cls, words, rebuild_limit=2000):
+    # Sustained one-at-a-time inserts into a fresh structure, against the
+    # old behaviour of re-sorting and rebuilding everything on each insert.
+    ds = cls()
+    start_time = time.perf_counter()
+    for word in words:
+        ds.insert(word)
+    incremental_time = time.perf_counter() - start_time
+
+    rebuild_words = words[:rebuild_limit]
+    current = []
+    seen = set()
+    start_time = time.perf_counter()
+    for word in rebuild_words:
+        if word not in seen:
+            seen.add(word)
+            current.append(word)
+            current.sort()
+            cls().bulk_insert(current)
+    rebuild_time = time.perf_counter() - start_time
+
+    return {
+        'incremental_ops': len(words) / incremental_time if incremental_time else 0.0,
+        'rebuild_ops': len(rebuild_words) / rebuild_time if rebuild_time else 0.0,
+    }
+
+
+def simulate_scalability(structures, corpus_sizes, corpus=None):
     scalability_results = {name: [] for name in structures.keys()}
+    if corpus is None:
+        # Read only as much of the corpus as the largest size needs, once.
+        corpus = list(islice(iter_corpus(), max(corpus_sizes, default=0)))
     for size in corpus_sizes:
-        subset_corpus = load_corpus()[:size]
+        subset_corpus = corpus[:size]
         for name, ds in structures.items():
-            ds_copy = type(ds)()
-            start_time = time.time()
+            ds_copy = structure_class(ds)()
+            start_time = time.perf_counter_ns()
             ds_copy.bulk_insert(subset_corpus)
-            end_time = time.time()
-            build_time = (end_time - start_time) * 1000
+            build_time = (time.perf_counter_ns() - start_time) / 1e6  # in ms
             memory = ds_copy.mem_usage()
             scalability_results[name].append(
                 {'size': size, 'build_time': build_time, 'memory': memory})